@@ -1,42 +1,74 @@
-from flask import Flask
-from flask_migrate import Migrate
-from .extensions import db, login_manager
+import os
 
-migrate = Migrate()  # Migration manager
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .config import PROFILES, engine_options
+from .extensions import db, login_manager, sql_instrumentation, configure_sqlite
+from .cache import catalog_cache
+from .fragments import fragment_cache
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     
-    # Configuration
-    app.config['SECRET_KEY'] = 'secretkey'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///../database.db'
+    # Configuration: profile from APP_CONFIG, then explicit overrides
+    profile = os.environ.get('APP_CONFIG', 'production')
+    app.config.from_object(PROFILES[profile])
+    if config:
+        app.config.update(config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    if app.config['TRUSTED_PROXIES']:
+        # request.remote_addr (login rate limits) and the scheme come from the proxy's headers
+        hops = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
 
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+    configure_sqlite(app)
+    if not app.config['SERVING']:
+        # Alembic is most of our import time and only `flask db` needs it
+        from flask_migrate import Migrate
+        # Migration manager; batch mode so SQLite can alter constraints
+        Migrate(app, db, directory=os.path.join(os.path.dirname(__file__), 'migrations'),
+                render_as_batch=True)
     login_manager.init_app(app)
+    sql_instrumentation.init_app(app)
+    catalog_cache.init_app(app)
+    fragment_cache.init_app(app)
+
+    from . import search, analytics, product_import, orders, jobs, tasks, carts, accounts
+    search.init_app(app)
+    analytics.init_app(app)
+    product_import.init_app(app)
+    orders.init_app(app)
+    jobs.init_app(app)
+    carts.init_app(app)
+    accounts.init_app(app)
 
-    # Import models (needed before using them)
-    from .models import User
+    from .identity import identity_cache
+    from .auth import auth_service
+    identity_cache.init_app(app)
+    auth_service.init_app(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return identity_cache.load(int(user_id))
 
     # Register blueprints
     from .routes.user_routes import user_bp
     from .routes.merchant_routes import merchant_bp
-    from .routes.admin_routes import admin_bp
+    from .routes.api_routes import api_bp
+    from .routes import lazy
 
     app.register_blueprint(user_bp)
     app.register_blueprint(merchant_bp)
-    app.register_blueprint(admin_bp)
+    lazy.register_blueprint(app, 'admin', lazy=app.config['SERVING'])
+    app.register_blueprint(api_bp)
 
     # ✅ Temporary admin creation route
     @app.route('/create_admin')
     def create_admin():
         from app.models import db, User
-        from werkzeug.security import generate_password_hash
+        from app.auth import auth_service
 
         # Prevent duplicate admin
         if User.query.filter_by(username='admin123').first():
@@ -45,7 +77,7 @@ def create_app():
         # Create admin
         admin = User(
             username='admin123',
-            password=generate_password_hash('adminpass'),
+            password=auth_service.hash_password('adminpass'),
             role='admin',
             approved=True
         )
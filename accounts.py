@@ -0,0 +1,172 @@
+# app/accounts.py
+# Account deletion in the background. The account is locked out at once;
+# its rows are then removed with set-based DELETEs of at most
+# DELETION_CHUNK_SIZE rows per job, each job committing on its own, so a
+# large merchant never holds the database write lock for long. Whatever
+# a DELETE does not remove explicitly goes with the ON DELETE CASCADE
+# foreign keys.
+import json
+from datetime import datetime
+
+from flask import current_app
+
+from . import analytics, search
+from .cache import catalog_cache
+from .extensions import db
+from .identity import identity_cache
+from .inventory import release_holds
+from .jobs import enqueue, enqueue_many, job
+from .models import Cart, Job, Notification, Order, Product, SalesRollup, User
+
+
+def _phases(user_id):
+    """(model, key columns, condition) in deletion order, children first."""
+    products = db.select(Product.id).where(Product.merchant_id == user_id).scalar_subquery()
+    return [
+        (Order, (Order.id,), Order.user_id == user_id),
+        (Order, (Order.id,), Order.product_id.in_(products)),
+        (Cart, (Cart.id,), Cart.product_id.in_(products)),
+        (SalesRollup, (SalesRollup.day, SalesRollup.product_id), SalesRollup.product_id.in_(products)),
+        (Notification, (Notification.id,), Notification.product_id.in_(products)),
+        (Notification, (Notification.id,), Notification.user_id == user_id),
+        (Product, (Product.id,), Product.merchant_id == user_id),
+    ]
+
+
+def remaining_rows(user_id):
+    return sum(db.session.scalar(db.select(db.func.count()).select_from(model).where(condition))
+               for model, _, condition in _phases(user_id))
+
+
+def delete_chunk(user_id, size):
+    """Delete up to `size` rows belonging to the account.
+
+    Returns (model, rows deleted), or (None, 0) once only the user row is left.
+    """
+    for model, keys, condition in _phases(user_id):
+        chunk = db.select(*keys).where(condition).limit(size)
+        if model is Product:
+            # Products leave the search index in the same transaction
+            chunk = db.session.scalars(chunk).all()
+            search.remove_products(chunk)
+        elif model is Order:
+            # ...and orders the sales figures
+            chunk = db.session.scalars(chunk).all()
+            analytics.remove_orders(chunk)
+        target = keys[0] if len(keys) == 1 else db.tuple_(*keys)
+        deleted = db.session.execute(
+            db.delete(model).where(target.in_(chunk)).execution_options(synchronize_session=False)
+        ).rowcount
+        if deleted:
+            return model, deleted
+    return None, 0
+
+
+def start_deletion(user):
+    """Lock the account out now and queue the purge; caller commits.
+    Returns False for accounts start_deletions() skips (admins)."""
+    return bool(start_deletions([user.id]))
+
+
+def start_deletions(user_ids):
+    """start_deletion for many accounts: one UPDATE, one cart release and
+    one job INSERT however many ids are given. Admin accounts and accounts
+    already being deleted are skipped; returns the ids actually started."""
+    user_ids = db.session.scalars(
+        db.select(User.id).where(User.id.in_(user_ids), User.role.in_(MANAGED_ROLES),
+                                 User.deleted_at.is_(None))
+    ).all()
+    if not user_ids:
+        return []
+    db.session.execute(
+        db.update(User).where(User.id.in_(user_ids))
+        .values(deleted_at=datetime.utcnow(), approved=False)
+        .execution_options(synchronize_session='fetch')
+    )
+    release_holds(Cart.user_id.in_(user_ids))    # gives back any stock held in their carts
+    db.session.execute(db.delete(Cart).where(Cart.user_id.in_(user_ids)))
+    # The first job counts the rows to delete, so this stays cheap
+    enqueue_many('delete_user', [({'user_id': user_id, 'total': None, 'deleted': 0},
+                                  f'delete_user:{user_id}:0') for user_id in user_ids])
+    return user_ids
+
+
+# ------------------ Admin listing and bulk actions ------------------
+STATUSES = ('pending', 'approved', 'deleting')
+MANAGED_ROLES = ('user', 'merchant')
+
+
+def user_filters(role=None, status=None, prefix=None):
+    """WHERE conditions for the admin user listing. Role and status are
+    served by ix_user_role_approved; the (case-sensitive) username prefix
+    is a range on the unique username index."""
+    conditions = [User.role == role if role in MANAGED_ROLES else User.role.in_(MANAGED_ROLES)]
+    if status == 'approved':
+        conditions.append(User.approved.is_(True))
+    elif status == 'pending':
+        conditions += [User.approved.is_(False), User.deleted_at.is_(None)]
+    elif status == 'deleting':
+        conditions.append(User.deleted_at.isnot(None))
+    if prefix:
+        conditions += [User.username >= prefix, User.username < prefix + '\U0010ffff']
+    return conditions
+
+
+def matching_ids(conditions, batch_size):
+    """Yield lists of at most batch_size ids matching `conditions`, in id order."""
+    last = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(User.id).where(*conditions, User.id > last).order_by(User.id).limit(batch_size)
+        ).all()
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def approve_users(user_ids):
+    """Approve many accounts with one UPDATE; returns how many changed."""
+    return db.session.execute(
+        db.update(User)
+        .where(User.id.in_(user_ids), User.role.in_(MANAGED_ROLES),
+               User.deleted_at.is_(None), User.approved.isnot(True))
+        .values(approved=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def deletion_progress():
+    """user_id -> {'deleted', 'total'} for accounts still being purged."""
+    payloads = db.session.scalars(
+        db.select(Job.payload).where(Job.kind == 'delete_user',
+                                     Job.status.in_(('pending', 'running')))
+    )
+    progress = {}
+    for payload in payloads:
+        data = json.loads(payload)
+        progress[data['user_id']] = data
+    return progress
+
+
+@job('delete_user')
+def handle_delete_user(payload):
+    user_id = payload['user_id']
+    if payload['total'] is None:
+        payload = dict(payload, total=remaining_rows(user_id))
+    model, deleted = delete_chunk(user_id, current_app.config['DELETION_CHUNK_SIZE'])
+    if model is Product:
+        catalog_cache.invalidate()      # commits with this job
+    if deleted:
+        # Commits together with this job; the next chunk is a new job
+        done = payload['deleted'] + deleted
+        enqueue('delete_user', dict(payload, deleted=done), key=f'delete_user:{user_id}:{done}')
+        return
+    db.session.execute(db.delete(User).where(User.id == user_id))
+    identity_cache.invalidate(user_id)
+
+
+def init_app(app):
+    app.config.setdefault('DELETION_CHUNK_SIZE', 2000)
+    app.config.setdefault('ADMIN_USERS_PER_PAGE', 50)
+    app.config.setdefault('BULK_BATCH_SIZE', 1000)       # accounts per UPDATE in bulk actions
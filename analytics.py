@@ -0,0 +1,276 @@
+# app/analytics.py
+from datetime import date, datetime, timedelta
+
+import click
+
+from .extensions import db
+from .models import MerchantSalesTotal, Order, Product, ProductSalesTotal, SalesRollup, User
+
+LOW_STOCK_THRESHOLD = 5
+
+
+# ------------------ Rollup maintenance ------------------
+def _upsert(model, keys, rows):
+    """Insert `rows` into `model`, adding units/revenue onto existing rows
+    with the same `keys`."""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        insert = None
+
+    if insert is None:
+        # Portable fallback: update in place, insert whatever was missing
+        for row in rows:
+            updated = db.session.execute(
+                db.update(model)
+                .where(*(getattr(model, key) == row[key] for key in keys))
+                .values(units=model.units + row['units'],
+                        revenue=model.revenue + row['revenue'])
+            ).rowcount
+            if not updated:
+                db.session.execute(db.insert(model), [row])
+        return
+
+    stmt = insert(model).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[getattr(model, key) for key in keys],
+        set_={
+            'units': model.units + stmt.excluded.units,
+            'revenue': model.revenue + stmt.excluded.revenue,
+        }
+    ))
+
+
+def _totals(rows, keys):
+    # Sum units/revenue of rows sharing `keys`, so one upsert statement
+    # never touches the same row twice
+    totals = {}
+    for row in rows:
+        key = tuple(row[k] for k in keys)
+        if key not in totals:
+            totals[key] = {k: row[k] for k in keys} | {'units': 0, 'revenue': 0.0}
+        totals[key]['units'] += row['units']
+        totals[key]['revenue'] += row['revenue']
+    return list(totals.values())
+
+
+# Sales figures only ever count orders that still exist, which is what
+# rebuild_rollups() recomputes: deleting orders (with a buyer's account or
+# a product) takes their sales back out of every table.
+def _apply(rows):
+    _upsert(SalesRollup, ('day', 'product_id'), _totals(rows, ('day', 'product_id', 'merchant_id')))
+    _upsert(ProductSalesTotal, ('product_id',), _totals(rows, ('product_id', 'merchant_id')))
+    _upsert(MerchantSalesTotal, ('merchant_id',), _totals(rows, ('merchant_id',)))
+
+
+def _drop_empty(product_ids, merchant_ids):
+    # rebuild_rollups() has no rows for products or merchants without sales
+    for model, condition in ((SalesRollup, SalesRollup.product_id.in_(product_ids)),
+                             (ProductSalesTotal, ProductSalesTotal.product_id.in_(product_ids)),
+                             (MerchantSalesTotal, MerchantSalesTotal.merchant_id.in_(merchant_ids))):
+        db.session.execute(db.delete(model).where(condition, model.units <= 0))
+
+
+def record_sales(lines, when=None):
+    """Add sold lines to today's rollup and the lifetime totals, inside the
+    caller's transaction.
+
+    `lines` is an iterable of (product, quantity) where product exposes
+    id, merchant_id and price. Lines for products deleted since (their
+    orders went with them) are skipped.
+    """
+    day = (when or datetime.utcnow()).date()
+    lines = list(lines)
+    existing = set(db.session.scalars(
+        db.select(Product.id).where(Product.id.in_({product.id for product, _ in lines}))))
+    rows = [
+        {'day': day, 'product_id': product.id, 'merchant_id': product.merchant_id,
+         'units': quantity, 'revenue': product.price * quantity}
+        for product, quantity in lines if product.id in existing
+    ]
+    if rows:
+        _apply(rows)
+
+
+def remove_orders(order_ids):
+    """Take the orders `order_ids` out of the rollups and totals, inside
+    the caller's transaction; call before deleting them."""
+    unit_price = db.func.coalesce(Order.unit_price, Product.price)
+    merchant_id = db.func.coalesce(Order.merchant_id, Product.merchant_id)
+    orders = db.session.execute(
+        db.select(Order.timestamp, Order.product_id, merchant_id, Order.quantity, unit_price)
+        .join(Product, Order.product_id == Product.id)
+        .where(Order.id.in_(order_ids))
+    ).all()
+    if not orders:
+        return
+    _apply([{'day': timestamp.date(), 'product_id': product_id, 'merchant_id': merchant,
+             'units': -quantity, 'revenue': -quantity * price}
+            for timestamp, product_id, merchant, quantity, price in orders])
+    _drop_empty({order[1] for order in orders}, {order[2] for order in orders})
+
+
+def remove_product_sales(product_id):
+    """Take a product's sales off its merchant's total before the product
+    is deleted; its rollup rows go with it (ON DELETE CASCADE)."""
+    total = db.session.get(ProductSalesTotal, product_id)
+    if total is None:
+        return
+    _upsert(MerchantSalesTotal, ('merchant_id',),
+            [{'merchant_id': total.merchant_id, 'units': -total.units, 'revenue': -total.revenue}])
+    _drop_empty([], [total.merchant_id])
+
+
+def rebuild_rollups():
+    """Recompute the daily rollups from the orders table, then the lifetime
+    totals from the rollups; one statement per table."""
+    day = db.func.date(Order.timestamp)
+    # Orders placed before the snapshot columns fall back to the current product
+    unit_price = db.func.coalesce(Order.unit_price, Product.price)
+    merchant_id = db.func.coalesce(Order.merchant_id, Product.merchant_id)
+    db.session.execute(db.delete(SalesRollup))
+    db.session.execute(
+        db.insert(SalesRollup).from_select(
+            ['day', 'product_id', 'merchant_id', 'units', 'revenue'],
+            db.select(
+                day,
+                Order.product_id,
+                db.func.max(merchant_id),
+                db.func.sum(Order.quantity),
+                db.func.sum(Order.quantity * unit_price)
+            )
+            .join(Product, Order.product_id == Product.id)
+            .group_by(day, Order.product_id)
+        )
+    )
+    # Lifetime totals are derived from the fresh daily rows
+    db.session.execute(db.delete(ProductSalesTotal))
+    db.session.execute(
+        db.insert(ProductSalesTotal).from_select(
+            ['product_id', 'merchant_id', 'units', 'revenue'],
+            db.select(SalesRollup.product_id, db.func.max(SalesRollup.merchant_id),
+                      db.func.sum(SalesRollup.units), db.func.sum(SalesRollup.revenue))
+            .group_by(SalesRollup.product_id)
+        )
+    )
+    db.session.execute(db.delete(MerchantSalesTotal))
+    db.session.execute(
+        db.insert(MerchantSalesTotal).from_select(
+            ['merchant_id', 'units', 'revenue'],
+            db.select(ProductSalesTotal.merchant_id, db.func.sum(ProductSalesTotal.units),
+                      db.func.sum(ProductSalesTotal.revenue))
+            .group_by(ProductSalesTotal.merchant_id)
+        )
+    )
+    db.session.commit()
+    return db.session.scalar(db.select(db.func.count()).select_from(SalesRollup))
+
+
+# ------------------ Dashboard queries (aggregates only) ------------------
+def revenue_by_day(days=30):
+    since = date.today() - timedelta(days=days - 1)
+    return db.session.execute(
+        db.select(SalesRollup.day,
+                  db.func.sum(SalesRollup.units).label('units'),
+                  db.func.sum(SalesRollup.revenue).label('revenue'))
+        .where(SalesRollup.day >= since)
+        .group_by(SalesRollup.day)
+        .order_by(SalesRollup.day.desc())
+    ).all()
+
+
+def top_products(days=30, limit=10):
+    since = date.today() - timedelta(days=days - 1)
+    # Grouping on product_id + 0 keeps SQLite on the day range of the
+    # primary key instead of walking all of ix_sales_rollup_product_id
+    product_id = (SalesRollup.product_id + 0).label('product_id')
+    totals = (
+        db.select(product_id,
+                  db.func.sum(SalesRollup.units).label('units'),
+                  db.func.sum(SalesRollup.revenue).label('revenue'))
+        .where(SalesRollup.day >= since)
+        .group_by(product_id)
+        .order_by(db.desc('revenue'))
+        .limit(limit)
+        .subquery()
+    )
+    return db.session.execute(
+        db.select(Product.name, totals.c.units, totals.c.revenue)
+        .join(totals, totals.c.product_id == Product.id)
+        .order_by(totals.c.revenue.desc())
+    ).all()
+
+
+def top_merchants(days=30, limit=10):
+    since = date.today() - timedelta(days=days - 1)
+    totals = (
+        db.select(SalesRollup.merchant_id,
+                  db.func.sum(SalesRollup.units).label('units'),
+                  db.func.sum(SalesRollup.revenue).label('revenue'))
+        .where(SalesRollup.day >= since)
+        .group_by(SalesRollup.merchant_id)
+        .order_by(db.desc('revenue'))
+        .limit(limit)
+        .subquery()
+    )
+    return db.session.execute(
+        db.select(User.username, totals.c.units, totals.c.revenue)
+        .join(totals, totals.c.merchant_id == User.id)
+        .order_by(totals.c.revenue.desc())
+    ).all()
+
+
+def low_stock(threshold=LOW_STOCK_THRESHOLD, limit=20):
+    return db.session.execute(
+        db.select(Product.id, Product.name, Product.stock, Product.merchant_id)
+        .where(Product.stock <= threshold)
+        .order_by(Product.stock, Product.id)
+        .limit(limit)
+    ).all()
+
+
+def merchant_totals(merchant_id):
+    # Primary-key lookup, independent of how many orders the merchant has
+    row = db.session.get(MerchantSalesTotal, merchant_id)
+    return {'units': row.units if row else 0, 'revenue': row.revenue if row else 0.0}
+
+
+def product_totals(merchant_id):
+    """product_id -> row(units, revenue) for the merchant's products that sold."""
+    rows = db.session.execute(
+        db.select(ProductSalesTotal.product_id, ProductSalesTotal.units, ProductSalesTotal.revenue)
+        .where(ProductSalesTotal.merchant_id == merchant_id)
+    ).all()
+    return {row.product_id: row for row in rows}
+
+
+def sell_through(units_sold, units_left):
+    """Share of all units ever stocked that have sold."""
+    stocked = units_sold + units_left
+    return units_sold / stocked if stocked else 0.0
+
+
+def account_counts():
+    rows = db.session.execute(
+        db.select(User.role, User.approved, db.func.count())
+        .group_by(User.role, User.approved)
+    ).all()
+    counts = {}
+    for role, approved, count in rows:
+        entry = counts.setdefault(role, {'approved': 0, 'pending': 0})
+        entry['approved' if approved else 'pending'] += count
+    return counts
+
+
+@click.command('analytics-rebuild')
+def rebuild_command():
+    """Rebuild the sales rollup and lifetime total tables from all orders."""
+    count = rebuild_rollups()
+    click.echo(f"Rebuilt {count} rollup rows.")
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_command)
@@ -0,0 +1,328 @@
+# app/asgi.py
+"""ASGI entry point: async storefront reads, everything else through WSGI.
+
+    uvicorn --factory app.asgi:create_asgi_app
+
+GET /, /cart and /orders run as coroutines. Their SQL goes through an async
+engine (aiosqlite for SQLite), so a slow client or a slow query waits on
+the event loop instead of holding a thread. Sessions, Flask-Login,
+templates and after_request hooks are the Flask app's own; the views share
+their statements and render_* helpers with routes/user_routes.py.
+
+Every other request, and any read the async views can't answer without
+blocking (remember-me logins, identities missing from a disabled identity
+cache), is handed to the unchanged WSGI app on a bounded thread pool.
+Without the async driver (pip install "sqlalchemy[asyncio]" aiosqlite)
+everything is served that way.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, request, session
+from flask_login import current_user
+from flask_login.config import COOKIE_NAME
+
+from . import create_app
+from .carts import cart_contents
+from .catalog import (add_stock_rows, as_row, catalog_response, missing_stock, page_key,
+                      page_statement, split_page, stock_rows, stock_stamp, with_stock)
+from .cache import catalog_cache
+from .extensions import db, configure_sqlite, sql_instrumentation
+from .identity import identity_cache
+from .orders import order_history
+from .routes.user_routes import render_cart, render_home, render_orders, requested_sort
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:     # SQLAlchemy's asyncio support needs greenlet
+    create_async_engine = None
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+MAX_MEMORY_BODY = 1024 * 1024     # larger request bodies spool to disk
+
+
+def async_engine(app):
+    """Async twin of the app's engine, or None when there is no driver for it."""
+    if create_async_engine is None:
+        return None
+    uri = app.config['ASYNC_DATABASE_URI']
+    if uri is None:
+        with app.app_context():
+            url = db.engine.url         # relative SQLite paths already resolved
+        # An in-memory database can't be shared with a second engine
+        if url.get_backend_name() not in ASYNC_DRIVERS or url.database in (None, '', ':memory:'):
+            return None
+        uri = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+    try:
+        engine = create_async_engine(uri, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    except ImportError as exc:
+        app.logger.warning("Async views disabled, %s is not installed", exc.name)
+        return None
+    configure_sqlite(app, engine.sync_engine)
+    sql_instrumentation.watch(app, engine.sync_engine)
+    return engine
+
+
+# ------------------ Async views ------------------
+# Called inside the Flask request context after before_request hooks; the
+# return value goes through the normal make_response/after_request path.
+
+async def off_loop(blocking, function, *args):
+    """Call `function`, in a worker thread when it does network I/O (a
+    redis cache backend); the thread sees the same request context."""
+    if not blocking:
+        return function(*args)
+    return await asyncio.to_thread(function, *args)
+
+
+async def home(sessions):
+    sort, cursor = requested_sort(), request.args.get('after')
+    per_page = current_app.config['PRODUCTS_PER_PAGE']
+
+    if catalog_cache.version_due():
+        # Read here, the version would come through the sync engine
+        async with sessions() as db_session:
+            catalog_cache.set_version((await db_session.execute(catalog_cache.version_statement())).first())
+
+    # As cached_product_page(), loaded asynchronously
+    remote = catalog_cache.remote
+    full_key, page = await off_loop(remote, catalog_cache.lookup, page_key(sort, cursor, per_page))
+    epoch = catalog_cache.stock_epoch()
+    if page is None:
+        async with sessions() as db_session:
+            products = (await db_session.scalars(page_statement(sort, cursor, per_page))).all()
+            products, next_cursor = split_page(products, sort, per_page)
+            page = [as_row(p) for p in products], next_cursor
+        await off_loop(remote, catalog_cache.store, full_key, page)
+        await off_loop(remote, add_stock_rows, {}, epoch, stock_rows(page[0]))
+    else:
+        rows, next_cursor = page
+        stock = await off_loop(remote, catalog_cache.stock, [row['id'] for row in rows])
+        statement = missing_stock(rows, stock)
+        if statement is not None:
+            async with sessions() as db_session:
+                loaded = (await db_session.execute(statement)).all()
+            await off_loop(remote, add_stock_rows, stock, epoch, loaded)
+        page = with_stock(rows, stock), next_cursor
+    # The anonymous HTML cache is in the same backend
+    return await off_loop(remote, catalog_response, lambda: render_home(sort, page), stock_stamp(page[0]))
+
+
+async def view_cart(sessions):
+    if not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    async with sessions() as db_session:
+        items = (await db_session.scalars(cart_contents(current_user.id))).all()
+    return render_cart(items)
+
+
+async def view_orders(sessions):
+    if not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    async with sessions() as db_session:
+        orders = (await db_session.scalars(order_history(current_user.id))).all()
+    return render_orders(orders)
+
+
+ASYNC_VIEWS = {
+    'user.home': home,
+    'user.view_cart': view_cart,
+    'user.view_orders': view_orders,
+}
+
+
+# ------------------ ASGI <-> WSGI ------------------
+async def read_body(receive):
+    body = tempfile.SpooledTemporaryFile(max_size=MAX_MEMORY_BODY)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body.seek(0)
+    return body
+
+
+def wsgi_environ(scope, body):
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(str(status).split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    }
+
+
+class StorefrontASGI:
+    """ASGI application wrapping the Flask app; see the module docstring."""
+
+    def __init__(self, app):
+        app.config.setdefault('ASYNC_DATABASE_URI', None)   # default: derived from the app's URI
+        app.config.setdefault('ASGI_WSGI_THREADS', 8)       # threads for the WSGI-served routes
+        app.config.setdefault('ASGI_MAX_ASYNC_VIEWS', 16)   # async views in flight at once
+        self.app = app
+        self.engine = async_engine(app)
+        self.sessions = async_sessionmaker(self.engine) if self.engine is not None else None
+        self.executor = ThreadPoolExecutor(app.config['ASGI_WSGI_THREADS'], thread_name_prefix='wsgi')
+        self.admission = asyncio.Semaphore(app.config['ASGI_MAX_ASYNC_VIEWS'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        environ = wsgi_environ(scope, await read_body(receive))
+        if self.sessions is not None and environ['REQUEST_METHOD'] == 'GET':
+            # Each await inside a view queues behind every other runnable
+            # request, so letting all of them start at once makes each one
+            # slower; the rest wait here in arrival order instead.
+            async with self.admission:
+                if await self.dispatch_async(environ, send):
+                    return
+        await self.dispatch_wsgi(environ, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def load_identity(self):
+        """Warm the identity cache so Flask-Login's user_loader won't block.
+
+        Returns False when the request has to go to WSGI instead.
+        """
+        user_id = session.get('_user_id')
+        if user_id is None:
+            # A remember-me cookie logs the user back in, which writes
+            return current_app.config.get('REMEMBER_COOKIE_NAME', COOKIE_NAME) not in request.cookies
+        if not identity_cache.enabled:
+            return False
+        if await off_loop(identity_cache.remote, identity_cache.get, user_id) is None:
+            async with self.sessions() as db_session:
+                row = (await db_session.execute(identity_cache.statement(int(user_id)))).first()
+            if row is None:
+                return False
+            await off_loop(identity_cache.remote, identity_cache.add, row)
+        return True
+
+    async def dispatch_async(self, environ, send):
+        """Serve the request with an async view; False if it isn't one."""
+        app = self.app
+        ctx = app.request_context(environ)
+        ctx.push()
+        error = None
+        try:
+            view = ASYNC_VIEWS.get(request.endpoint)
+            if view is None or not await self.load_identity():
+                return False
+            # As Flask.full_dispatch_request, with the view awaited
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(self.sessions)
+                except Exception as exc:
+                    rv = app.handle_user_exception(exc)
+                response = app.finalize_request(rv)
+            except Exception as exc:
+                error = exc
+                response = app.handle_exception(exc)
+        finally:
+            ctx.pop(error)
+
+        await send(start_message(response.status, response.headers.to_wsgi_list()))
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+        # call_on_close callbacks (inline jobs) may block
+        await asyncio.get_running_loop().run_in_executor(self.executor, response.close)
+        return True
+
+    async def dispatch_wsgi(self, environ, send):
+        loop = asyncio.get_running_loop()
+
+        def forward(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        await loop.run_in_executor(self.executor, self.run_wsgi, environ, forward)
+
+    def run_wsgi(self, environ, forward):
+        # Runs on the pool. The whole response is produced on one thread so
+        # stream_with_context generators keep their context.
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = start_message(status, headers)
+            return write
+
+        def write(chunk):
+            if not response.get('started'):
+                response['started'] = True
+                forward(response['start'])
+            if chunk:
+                forward({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        body = self.app(environ, start_response)
+        try:
+            for chunk in body:
+                write(chunk)
+            write(b'')
+            forward({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+def create_asgi_app(config=None):
+    return StorefrontASGI(create_app(config))
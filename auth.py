@@ -0,0 +1,115 @@
+# app/auth.py
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .extensions import db
+from .models import User
+
+
+class TokenBucket:
+    """Token buckets keyed by an arbitrary string (IP, username, ...).
+
+    `rate` tokens are added per second up to `capacity`. Only the most
+    recently used `max_keys` buckets are kept, so memory stays bounded
+    during a flood of distinct keys.
+    """
+
+    def __init__(self, capacity, rate, max_keys=100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+class AuthService:
+    """Password hashing and throttled login shared by all three blueprints.
+
+    The login buckets live in each worker process, so with N workers a
+    client gets up to N times the configured rates. The per-IP bucket keys
+    on request.remote_addr; behind a reverse proxy set TRUSTED_PROXIES so
+    that is the client's address rather than the proxy's.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')   # e.g. 'pbkdf2:sha256:600000'
+        app.config.setdefault('LOGIN_RATE_LIMIT', True)
+        app.config.setdefault('LOGIN_IP_BURST', 20)
+        app.config.setdefault('LOGIN_IP_PER_MINUTE', 30)
+        app.config.setdefault('LOGIN_USER_BURST', 5)
+        app.config.setdefault('LOGIN_USER_PER_MINUTE', 10)
+        app.extensions['auth'] = {
+            'ip': TokenBucket(app.config['LOGIN_IP_BURST'], app.config['LOGIN_IP_PER_MINUTE'] / 60),
+            'user': TokenBucket(app.config['LOGIN_USER_BURST'], app.config['LOGIN_USER_PER_MINUTE'] / 60),
+        }
+
+    # ------------------ Hashing ------------------
+    @staticmethod
+    def hash_password(password):
+        return generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
+
+    @staticmethod
+    def needs_rehash(stored_hash):
+        method = stored_hash.split('$', 1)[0]
+        wanted = current_app.config['PASSWORD_HASH_METHOD']
+        # Werkzeug stores defaults explicitly ('scrypt' -> 'scrypt:32768:8:1')
+        return not (method == wanted or method.startswith(wanted + ':'))
+
+    # ------------------ Login ------------------
+    @staticmethod
+    def allow_attempt(username):
+        """Spend a token for this IP and username; False means reject unhashed."""
+        if not current_app.config['LOGIN_RATE_LIMIT']:
+            return True
+        buckets = current_app.extensions['auth']
+        return (buckets['ip'].consume(request.remote_addr or 'unknown')
+                and buckets['user'].consume(username.lower()))
+
+    def authenticate(self, username, password, role=None):
+        """Return the matching User, or None for bad credentials.
+
+        Raises RateLimited before any hashing when the caller is throttled.
+        """
+        if not self.allow_attempt(username):
+            raise RateLimited()
+
+        query = User.query.filter_by(username=username, deleted_at=None)
+        if role is not None:
+            query = query.filter_by(role=role)
+        user = query.first()
+        if not user or not check_password_hash(user.password, password):
+            return None
+
+        # Transparently upgrade hashes made with an older cost setting
+        if self.needs_rehash(user.password):
+            user.password = self.hash_password(password)
+            db.session.commit()
+        return user
+
+
+class RateLimited(Exception):
+    pass
+
+
+auth_service = AuthService()
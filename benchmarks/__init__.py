@@ -0,0 +1,97 @@
+# app/benchmarks/__init__.py
+# Shared helpers for the benchmark scripts. Run them from the directory that
+# contains the `app` package, e.g. `python -m app.benchmarks.catalog`.
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.extensions import db
+
+
+def make_app(**config):
+    # Every benchmark gets its own throwaway SQLite file
+    tmpdir = tempfile.mkdtemp(prefix='ecom-bench-')
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+        'TESTING': True,
+        'LOGIN_RATE_LIMIT': False,      # scenarios log many users in from one address
+        'JOBS_INLINE': True,            # no separate worker; jobs run after each request
+    }
+    settings.update(config)
+    app = create_app(settings)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_merchant(username='bench-merchant'):
+    from app.models import User
+    merchant = User(username=username, password=generate_password_hash('x'),
+                    role='merchant', approved=True)
+    db.session.add(merchant)
+    db.session.commit()
+    return merchant
+
+
+def seed_products(count, merchant_id, batch_size=10000):
+    from app.models import Product
+    for start in range(0, count, batch_size):
+        rows = [
+            {'name': f'Product {i:07d}', 'price': round((i * 7919) % 100000 / 100, 2),
+             'stock': 100, 'merchant_id': merchant_id}
+            for i in range(start, min(start + batch_size, count))
+        ]
+        db.session.execute(db.insert(Product), rows)
+        db.session.commit()
+
+
+def seed_orders(count, user_id, products, days=365):
+    # Generated entirely in SQL so millions of rows take seconds
+    db.session.execute(db.text(
+        """
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count)
+        INSERT INTO "order" (user_id, product_id, quantity, timestamp,
+                             unit_price, product_name, merchant_id)
+        SELECT :user_id, p.id, 1 + i % 3,
+               datetime('now', '-' || (i % :days) || ' days') || '.000000',   -- ORM format
+               p.price, p.name, p.merchant_id
+        FROM n JOIN product p ON p.id = 1 + (i * 7919) % :products
+        """
+    ), {'count': count, 'user_id': user_id, 'products': products, 'days': days})
+    db.session.commit()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        'p50_ms': round(statistics.median(ordered) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+        'p99_ms': round(pick(0.99) * 1000, 3),
+    }
+
+
+def time_requests(client, url, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, (url, response.status_code)
+    return percentiles(samples)
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    db.event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        db.event.remove(engine, 'before_cursor_execute', listener)
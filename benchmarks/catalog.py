@@ -0,0 +1,45 @@
+# app/benchmarks/catalog.py
+# Storefront latency for the first and a deep keyset page:
+#   python -m app.benchmarks.catalog --products 200000
+import argparse
+import json
+
+from app.benchmarks import make_app, seed_merchant, seed_products, time_requests
+from app.catalog import SORT_OPTIONS, encode_cursor, product_page
+from app.extensions import db
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_app(CACHE_BACKEND='null')   # measure the SQL path, not the cache
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(args.products, merchant.id)
+
+    client = app.test_client()
+    per_page = app.config['PRODUCTS_PER_PAGE']
+    results = {'products': args.products, 'per_page': per_page}
+
+    for sort in SORT_OPTIONS:
+        # Find the cursor that lands on the requested deep page
+        with app.app_context():
+            offset = min((args.page - 1) * per_page, args.products - 1)
+            rows = product_page(sort=sort, per_page=offset)[0]
+            cursor = encode_cursor(rows[-1], sort) if rows else None
+            db.session.remove()
+
+        results[sort] = {
+            'page_1': time_requests(client, f'/?sort={sort}', args.repeat),
+            f'page_{args.page}': time_requests(client, f'/?sort={sort}&after={cursor}', args.repeat),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
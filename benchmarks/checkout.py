@@ -0,0 +1,68 @@
+# app/benchmarks/checkout.py
+# Commits and wall time for checking out a cart in one transaction versus
+# buying each line through buy_now:
+#   python -m app.benchmarks.checkout --items 20 --rounds 50
+import argparse
+import json
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import make_app, seed_merchant, seed_products
+from app.extensions import db
+from app.models import User
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(args.items, merchant.id)
+        db.session.execute(db.text("UPDATE product SET stock = 1000000"))
+        db.session.add(User(username='shopper', password=generate_password_hash('pw'),
+                            role='user', approved=True))
+        db.session.commit()
+        commits = []
+        db.event.listen(db.engine, 'commit', lambda conn: commits.append(1))
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'shopper', 'password': 'pw'})
+
+    def fill_cart():
+        for product_id in range(1, args.items + 1):
+            client.post(f'/add_to_cart/{product_id}', data={'quantity': 1})
+
+    def via_checkout():
+        client.post('/checkout')
+
+    def via_buy_now():
+        for product_id in range(1, args.items + 1):
+            client.post(f'/buy_now/{product_id}', data={'quantity': 1})
+        for product_id in range(1, args.items + 1):
+            client.get(f'/remove_from_cart/{product_id}')
+
+    results = {'items_per_cart': args.items, 'rounds': args.rounds}
+    for name, strategy in (('checkout', via_checkout), ('buy_now_loop', via_buy_now)):
+        elapsed = 0.0
+        commit_count = 0
+        for _ in range(args.rounds):
+            fill_cart()
+            commits.clear()
+            start = time.perf_counter()
+            strategy()
+            elapsed += time.perf_counter() - start
+            commit_count += len(commits)
+        results[name] = {
+            'ms_per_cart': round(elapsed / args.rounds * 1000, 3),
+            'commits_per_cart': commit_count / args.rounds,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
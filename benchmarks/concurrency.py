@@ -0,0 +1,71 @@
+# app/benchmarks/concurrency.py
+# Mixed read/write throughput with SQLite defaults versus the tuned
+# connection settings (WAL, synchronous=NORMAL, busy timeout, mmap):
+#   python -m app.benchmarks.concurrency --threads 16 --requests 4000
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import make_app, seed_merchant, seed_products
+from app.config import Config
+from app.extensions import db
+from app.models import User
+
+
+def run(pragmas, args):
+    app = make_app(SQLITE_PRAGMAS=pragmas)
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(args.products, merchant.id)
+        db.session.execute(db.text("UPDATE product SET stock = 1000000"))
+        password = generate_password_hash('pw')
+        db.session.add_all(User(username=f'buyer{i}', password=password, role='user', approved=True)
+                           for i in range(args.threads))
+        db.session.commit()
+
+    local = threading.local()
+    counter = iter(range(args.threads))
+
+    def request(n):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            local.client.post('/login', data={'username': f'buyer{next(counter)}', 'password': 'pw'})
+        if random.random() < args.write_ratio:
+            product_id = random.randint(1, args.products)
+            return local.client.post(f'/buy_now/{product_id}', data={'quantity': 1}).status_code
+        return local.client.get('/?sort=price').status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        statuses = list(pool.map(request, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_sec': round(args.requests / elapsed, 1),
+        'errors': sum(1 for status in statuses if status >= 500),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {
+        'threads': args.threads,
+        'write_ratio': args.write_ratio,
+        'sqlite_defaults': run({}, args),
+        'tuned': run(Config.SQLITE_PRAGMAS, args),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
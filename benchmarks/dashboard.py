@@ -0,0 +1,49 @@
+# app/benchmarks/dashboard.py
+# Admin dashboard latency over a large order history. Orders are generated
+# in SQL and the rollups rebuilt once, as `flask analytics-rebuild` would:
+#   python -m app.benchmarks.dashboard --orders 10000000
+import argparse
+import json
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.analytics import rebuild_rollups
+from app.benchmarks import make_app, seed_merchant, seed_orders, seed_products, time_requests
+from app.extensions import db
+from app.models import User
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(args.products, merchant.id)
+        admin = User(username='admin', password=generate_password_hash('pw'), role='admin', approved=True)
+        db.session.add(admin)
+        db.session.commit()
+        seed_orders(args.orders, admin.id, args.products, args.days)
+        start = time.perf_counter()
+        rollup_rows = rebuild_rollups()
+        rebuild_seconds = time.perf_counter() - start
+
+    client = app.test_client()
+    client.post('/admin/login', data={'username': 'admin', 'password': 'pw'})
+    results = {
+        'orders': args.orders,
+        'rollup_rows': rollup_rows,
+        'rebuild_seconds': round(rebuild_seconds, 2),
+        'dashboard': time_requests(client, '/admin/dashboard', args.repeat),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
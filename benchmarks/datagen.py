@@ -0,0 +1,83 @@
+# app/benchmarks/datagen.py
+# Synthetic data at named scales. All rows are bulk inserted; passwords
+# use one cheap hash shared by every account ('pw').
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app.analytics import rebuild_rollups
+from app.extensions import db
+from app.models import Cart, Order, Product, User
+from app.search import rebuild_index
+
+SCALES = {
+    'tiny':   {'users': 20,     'merchants': 2,   'products': 200,     'carts': 40,     'orders': 500},
+    'small':  {'users': 500,    'merchants': 20,  'products': 10000,   'carts': 2000,   'orders': 50000},
+    'medium': {'users': 5000,   'merchants': 100, 'products': 100000,  'carts': 20000,  'orders': 1000000},
+    'large':  {'users': 50000,  'merchants': 500, 'products': 1000000, 'carts': 200000, 'orders': 10000000},
+}
+PASSWORD = 'pw'
+BATCH_SIZE = 20000
+
+
+def _bulk(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+    db.session.commit()
+
+
+def generate(scale='small', seed=42):
+    """Populate the current app's database; returns the sizes used."""
+    sizes = SCALES[scale] if isinstance(scale, str) else scale
+    rng = random.Random(seed)
+    password = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+
+    _bulk(User, ({'username': f'admin{i}', 'password': password, 'role': 'admin', 'approved': True}
+                 for i in range(1)))
+    _bulk(User, ({'username': f'merchant{i}', 'password': password, 'role': 'merchant', 'approved': True}
+                 for i in range(sizes['merchants'])))
+    _bulk(User, ({'username': f'user{i}', 'password': password, 'role': 'user', 'approved': i % 10 != 0}
+                 for i in range(sizes['users'])))
+
+    merchant_ids = db.session.scalars(db.select(User.id).where(User.role == 'merchant')).all()
+    user_ids = db.session.scalars(db.select(User.id).where(User.role == 'user')).all()
+
+    products = []
+    for i in range(sizes['products']):
+        products.append({'id': i + 1, 'name': f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+                         'price': round(rng.uniform(1, 5000), 2), 'stock': rng.randint(0, 500),
+                         'merchant_id': merchant_ids[i % len(merchant_ids)], 'sku': f'SKU{i}'})
+    _bulk(Product, iter(products))
+
+    carts = set()
+    while len(carts) < min(sizes['carts'], len(user_ids) * sizes['products']):
+        carts.add((rng.choice(user_ids), rng.randint(1, sizes['products'])))
+    _bulk(Cart, ({'user_id': u, 'product_id': p, 'quantity': rng.randint(1, 3)} for u, p in carts))
+
+    now = datetime.utcnow()
+
+    def orders():
+        for _ in range(sizes['orders']):
+            product = products[rng.randrange(sizes['products'])]
+            yield {'user_id': rng.choice(user_ids), 'product_id': product['id'],
+                   'quantity': rng.randint(1, 3), 'timestamp': now - timedelta(minutes=rng.randint(0, 525600)),
+                   'unit_price': product['price'], 'product_name': product['name'],
+                   'merchant_id': product['merchant_id']}
+    _bulk(Order, orders())
+
+    rebuild_rollups()
+    rebuild_index()
+    return sizes
+
+
+ADJECTIVES = ['Blue', 'Red', 'Green', 'Classic', 'Modern', 'Vintage', 'Compact', 'Deluxe',
+              'Organic', 'Wireless', 'Smart', 'Portable', 'Cotton', 'Leather', 'Steel']
+NOUNS = ['Shirt', 'Jeans', 'Lamp', 'Chair', 'Phone', 'Speaker', 'Watch', 'Backpack',
+         'Kettle', 'Notebook', 'Headphones', 'Sneakers', 'Mug', 'Desk', 'Blanket']
@@ -0,0 +1,54 @@
+# app/benchmarks/export.py
+# Peak Python memory while streaming a large order export:
+#   python -m app.benchmarks.export --orders 10000000
+import argparse
+import json
+import resource
+import time
+import tracemalloc
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import make_app, seed_merchant, seed_orders, seed_products
+from app.extensions import db
+from app.models import User
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(1000, merchant.id)
+        admin = User(username='admin', password=generate_password_hash('pw'), role='admin', approved=True)
+        db.session.add(admin)
+        db.session.commit()
+        seed_orders(args.orders, admin.id, 1000)
+
+    client = app.test_client()
+    client.post('/admin/login', data={'username': 'admin', 'password': 'pw'})
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(f'/admin/orders/export?format={args.format}', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(json.dumps({
+        'orders': args.orders,
+        'format': args.format,
+        'bytes': size,
+        'seconds': round(elapsed, 2),
+        'peak_python_mb': round(peak / 2 ** 20, 2),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# app/benchmarks/fragments.py
+# Storefront render throughput for a logged-in shopper walking the whole
+# catalog, with product card fragments uncached, cold and warm:
+#   python -m app.benchmarks.fragments --products 10000
+import argparse
+import json
+import re
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import make_app, seed_merchant, seed_products
+from app.extensions import db
+from app.fragments import fragment_cache
+from app.models import User
+
+NEXT_PAGE = re.compile(r'href="(/\?sort=\w+&amp;after=[^"]+)"')
+
+
+def walk_catalog(client):
+    # Follow "Next Page" links from the first page to the last
+    url, pages, started = '/?sort=newest', 0, time.perf_counter()
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        pages += 1
+        match = NEXT_PAGE.search(html)
+        url = match.group(1).replace('&amp;', '&') if match else None
+    return pages, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--max-bytes', type=int, default=8 * 1024 * 1024)
+    args = parser.parse_args()
+
+    results = {'products': args.products, 'per_page': args.per_page}
+    for label, max_bytes in (('uncached', 0), ('cached', args.max_bytes)):
+        app = make_app(PRODUCTS_PER_PAGE=args.per_page, FRAGMENT_CACHE_MAX_BYTES=max_bytes)
+        with app.app_context():
+            merchant = seed_merchant()
+            seed_products(args.products, merchant.id)
+            db.session.add(User(username='shopper', password=generate_password_hash('x'),
+                                role='user', approved=True))
+            db.session.commit()
+
+        client = app.test_client()
+        client.post('/login', data={'username': 'shopper', 'password': 'x'})
+        for run in ('cold', 'warm'):
+            pages, elapsed = walk_catalog(client)
+            results[f'{label}_{run}'] = {
+                'pages': pages,
+                'seconds': round(elapsed, 3),
+                'cards_per_second': round(args.products / elapsed),
+            }
+        with app.app_context():
+            results[f'{label}_stats'] = fragment_cache.stats()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
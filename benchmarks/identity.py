@@ -0,0 +1,54 @@
+# app/benchmarks/identity.py
+# Queries per authenticated request with and without the identity cache:
+#   python -m app.benchmarks.identity --requests 500
+import argparse
+import json
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import count_queries, make_app
+from app.extensions import db
+from app.models import User
+
+URLS = ['/', '/cart', '/orders']
+
+
+def run(ttl, requests):
+    app = make_app(IDENTITY_CACHE_TTL=ttl)
+    with app.app_context():
+        db.session.add(User(username='shopper', password=generate_password_hash('pw'),
+                            role='user', approved=True))
+        db.session.commit()
+        engine = db.engine
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'shopper', 'password': 'pw'})
+    client.get('/')                     # warm caches
+
+    with count_queries(engine) as statements:
+        start = time.perf_counter()
+        for i in range(requests):
+            client.get(URLS[i % len(URLS)])
+        elapsed = time.perf_counter() - start
+    user_queries = sum(1 for statement in statements if 'FROM user' in statement)
+    return {
+        'queries_per_request': round(len(statements) / requests, 2),
+        'user_queries_per_request': round(user_queries / requests, 2),
+        'ms_per_request': round(elapsed / requests * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps({
+        'requests': args.requests,
+        'uncached': run(0, args.requests),
+        'cached': run(60, args.requests),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
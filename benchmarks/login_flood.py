@@ -0,0 +1,67 @@
+# app/benchmarks/login_flood.py
+# Storefront latency while attacker threads flood the login form with bad
+# passwords, with and without login rate limiting:
+#   python -m app.benchmarks.login_flood --attackers 8 --seconds 10
+import argparse
+import json
+import threading
+import time
+
+from app.auth import AuthService
+from app.benchmarks import make_app, percentiles, seed_merchant, seed_products
+from app.extensions import db
+from app.models import User
+
+
+def run(rate_limit, args):
+    app = make_app(LOGIN_RATE_LIMIT=rate_limit)
+    with app.app_context(), app.test_request_context():
+        merchant = seed_merchant()
+        seed_products(1000, merchant.id)
+        db.session.add(User(username='victim', password=AuthService.hash_password('secret'),
+                            role='user', approved=True))
+        db.session.commit()
+
+    stop = threading.Event()
+    attempts = []
+
+    def attacker(n):
+        client = app.test_client()
+        count = 0
+        while not stop.is_set():
+            client.post('/login', data={'username': 'victim', 'password': f'guess{n}-{count}'})
+            count += 1
+        attempts.append(count)
+
+    threads = [threading.Thread(target=attacker, args=(n,)) for n in range(args.attackers)]
+    for thread in threads:
+        thread.start()
+
+    shopper = app.test_client()
+    samples = []
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        shopper.get('/?sort=price')
+        samples.append(time.perf_counter() - start)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return dict(percentiles(samples), storefront_requests=len(samples), login_attempts=sum(attempts))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--attackers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+    print(json.dumps({
+        'attackers': args.attackers,
+        'no_rate_limit': run(False, args),
+        'rate_limited': run(True, args),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
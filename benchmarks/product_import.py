@@ -0,0 +1,47 @@
+# app/benchmarks/product_import.py
+# Bulk import throughput for a generated merchant catalog:
+#   python -m app.benchmarks.product_import --rows 100000
+import argparse
+import io
+import json
+import time
+
+from app.benchmarks import make_app, seed_merchant
+from app.extensions import db
+from app.models import Product
+from app.product_import import import_products
+
+
+def make_csv(rows, bad_every):
+    lines = ['sku,name,price,stock']
+    for i in range(rows):
+        price = 'n/a' if bad_every and i % bad_every == 0 else f'{(i % 5000) / 10:.2f}'
+        lines.append(f'SKU-{i:07d},Imported product {i},{price},{i % 50}')
+    return '\n'.join(lines).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--bad-every', type=int, default=1000)
+    args = parser.parse_args()
+
+    payload = make_csv(args.rows, args.bad_every)
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        results = {'rows': args.rows}
+        for run in ('insert', 'update'):
+            start = time.perf_counter()
+            report = import_products(merchant.id, io.BytesIO(payload), 'csv')
+            results[run] = {
+                'seconds': round(time.perf_counter() - start, 2),
+                'imported': report.imported,
+                'failed': report.failed,
+            }
+        results['products'] = db.session.scalar(db.select(db.func.count()).select_from(Product))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
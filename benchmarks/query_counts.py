@@ -0,0 +1,82 @@
+# app/benchmarks/query_counts.py
+# Guards against N+1 regressions: every view must issue the same number of
+# queries whether the user has a handful of rows or hundreds.
+#   python -m app.benchmarks.query_counts
+import json
+import sys
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import count_queries, make_app, seed_merchant, seed_products
+from app.extensions import db
+from app.models import Cart, Order, Product, User
+from app.orders import snapshot
+
+VIEWS = {
+    'shopper': ['/', '/cart', '/orders'],
+    'merchant': ['/merchant/dashboard', '/merchant/orders'],
+    'admin': ['/admin/users', '/admin/products', '/admin/orders'],
+}
+LOGIN_URLS = {'shopper': '/login', 'merchant': '/merchant/login', 'admin': '/admin/login'}
+
+
+def add_rows(shopper_id, product_ids):
+    products = Product.query.filter(Product.id.in_(list(product_ids))).all()
+    db.session.add_all(Cart(user_id=shopper_id, product_id=p.id, quantity=1) for p in products)
+    db.session.add_all(Order(user_id=shopper_id, product_id=p.id, quantity=1, **snapshot(p))
+                       for p in products)
+    db.session.commit()
+
+
+def measure(clients):
+    with clients['shopper'].application.app_context():
+        engine = db.engine
+    counts = {}
+    for role, urls in VIEWS.items():
+        for url in urls:
+            with count_queries(engine) as statements:
+                response = clients[role].get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            counts[url] = len(statements)
+    return counts
+
+
+def prepare():
+    """App with 300 products and one logged-in client per role; returns
+    (app, clients, shopper id). The shopper starts with three cart lines
+    and three orders."""
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        merchant.password = generate_password_hash('pw')
+        seed_products(300, merchant.id)
+        password = generate_password_hash('pw')
+        shopper = User(username='shopper', password=password, role='user', approved=True)
+        admin = User(username='admin', password=password, role='admin', approved=True)
+        db.session.add_all([shopper, admin])
+        db.session.commit()
+        shopper_id = shopper.id
+        add_rows(shopper_id, range(1, 4))
+
+    clients = {}
+    for role, username in (('shopper', 'shopper'), ('merchant', 'bench-merchant'), ('admin', 'admin')):
+        clients[role] = app.test_client()
+        clients[role].post(LOGIN_URLS[role], data={'username': username, 'password': 'pw'})
+    return app, clients, shopper_id
+
+
+def main():
+    app, clients, shopper_id = prepare()
+    small = measure(clients)
+    with app.app_context():
+        add_rows(shopper_id, range(4, 301))
+    large = measure(clients)
+
+    print(json.dumps({'small': small, 'large': large}, indent=2))
+    grown = [url for url in small if large[url] > small[url]]
+    if grown:
+        sys.exit(f"Query count grows with row count for: {', '.join(grown)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# app/benchmarks/run.py
+# Reproducible end-to-end benchmark over all blueprints.
+#   python -m app.benchmarks.run --scale small --mix realistic --requests 5000 -o before.json
+#   python -m app.benchmarks.run --scale small --mix realistic --requests 5000 --baseline before.json
+# Results are JSON (sorted keys) keyed by action, with p50/p95/p99 and
+# queries per request, so two runs can be diffed directly.
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from app.benchmarks import make_app, percentiles
+from app.benchmarks import scenarios
+from app.benchmarks.datagen import PASSWORD, SCALES, generate
+from app.extensions import db
+from app.models import Product, User
+
+
+class ClientContext:
+    def __init__(self, app, role, n, sizes, rng):
+        self.rng = rng
+        self.sizes = sizes
+        self.role = role
+        self.client = app.test_client()
+        spec = scenarios.ROLES[role]
+        # Only every tenth generated shopper is unapproved; skip those
+        shopper = role in ('shopper', 'api')
+        number = n % sizes['users'] if shopper else n % sizes['merchants']
+        if shopper and number % 10 == 0:
+            number += 1
+        self.username = spec['username'].format(n=number)
+        self.client.post(spec['login'], data={'username': self.username, 'password': PASSWORD})
+        self.own_products = []
+        if role == 'merchant':
+            with app.app_context():
+                merchant_id = db.session.scalar(db.select(User.id).where(User.username == self.username))
+                self.own_products = db.session.scalars(
+                    db.select(Product.id).where(Product.merchant_id == merchant_id).limit(100)).all()
+
+    def product_id(self):
+        return self.rng.randint(1, self.sizes['products'])
+
+    def own_product_id(self):
+        return self.rng.choice(self.own_products) if self.own_products else 1
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    app = make_app()
+    start = time.perf_counter()
+    with app.app_context():
+        sizes = generate(args.scale, seed=args.seed)
+        engine = db.engine
+    seed_seconds = time.perf_counter() - start
+
+    mix = scenarios.MIXES[args.mix]
+    total = sum(mix.values())
+    # At least one client per role in the mix, the rest split by share
+    counts = {role: max(1, args.clients * share // total) for role, share in mix.items()}
+    contexts = [ClientContext(app, role, i, sizes, rng)
+                for role, count in counts.items() for i in range(count)]
+
+    query_count = [0]
+    db.event.listen(engine, 'before_cursor_execute', lambda *a: query_count.__setitem__(0, query_count[0] + 1))
+
+    samples = {}
+    for _ in range(args.requests):
+        ctx = rng.choice(contexts)
+        actions = scenarios.ROLES[ctx.role]['actions']
+        name, _, method, url, data = rng.choices(actions, weights=[a[1] for a in actions])[0]
+
+        path = url(ctx)
+        payload = data(ctx) if data else None
+        # The JSON API takes JSON bodies, the HTML views take forms
+        body = {'json': payload} if path.startswith('/api/') else {'data': payload}
+
+        query_count[0] = 0
+        began = time.perf_counter()
+        if method == 'GET':
+            response = ctx.client.get(path)
+        else:
+            response = ctx.client.post(path, **body)
+        elapsed = time.perf_counter() - began
+        entry = samples.setdefault(name, {'times': [], 'queries': 0, 'errors': 0})
+        entry['times'].append(elapsed)
+        entry['queries'] += query_count[0]
+        entry['errors'] += response.status_code >= 500
+
+    results = {}
+    for name, entry in samples.items():
+        count = len(entry['times'])
+        results[name] = dict(percentiles(entry['times']), requests=count, errors=entry['errors'],
+                             queries_per_request=round(entry['queries'] / count, 2))
+    return {
+        'meta': {'scale': args.scale, 'sizes': sizes, 'mix': args.mix, 'requests': args.requests,
+                 'clients': args.clients, 'seed': args.seed, 'revision': git_revision(),
+                 'seed_seconds': round(seed_seconds, 2)},
+        'actions': results,
+    }
+
+
+def compare(current, baseline):
+    lines = [f"{'action':<20} {'p50 ms':>16} {'p99 ms':>16} {'queries/req':>16}"]
+    for name, now in sorted(current['actions'].items()):
+        before = baseline['actions'].get(name)
+        if before is None:
+            continue
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'queries_per_request'):
+            delta = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            cells.append(f"{now[key]:>8} ({delta:+5.0f}%)")
+        lines.append(f"{name:<20} " + ' '.join(f"{cell:>16}" for cell in cells))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--mix', choices=sorted(scenarios.MIXES), default='realistic')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help="Write JSON results to this file.")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare against.")
+    args = parser.parse_args()
+
+    results = run(args)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            print(compare(results, json.load(handle)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# app/benchmarks/scenarios.py
+# Weighted request mixes per role. Each action is
+#   (name, weight, method, url(ctx), form data(ctx) or None)
+# where ctx holds the client's random generator and the dataset sizes.
+
+SHOPPER = [
+    ('home', 30, 'GET', lambda c: '/', None),
+    ('home_sorted', 10, 'GET', lambda c: '/?sort=' + c.rng.choice(['price', 'name']), None),
+    ('search', 15, 'GET', lambda c: '/search?q=' + c.rng.choice(['blue', 'lamp', 'smart wat', 'desk']), None),
+    ('view_cart', 15, 'GET', lambda c: '/cart', None),
+    ('add_to_cart', 8, 'POST', lambda c: f'/add_to_cart/{c.product_id()}', lambda c: {'quantity': 1}),
+    ('buy_now', 5, 'POST', lambda c: f'/buy_now/{c.product_id()}', lambda c: {'quantity': 1}),
+    ('checkout', 2, 'POST', lambda c: '/checkout', None),
+    ('view_orders', 15, 'GET', lambda c: '/orders', None),
+]
+
+MERCHANT = [
+    ('merchant_dashboard', 40, 'GET', lambda c: '/merchant/dashboard', None),
+    ('merchant_orders', 40, 'GET', lambda c: '/merchant/orders', None),
+    ('restock', 20, 'POST', lambda c: f'/merchant/restock/{c.own_product_id()}', lambda c: {'quantity': 5}),
+]
+
+ADMIN = [
+    ('admin_dashboard', 40, 'GET', lambda c: '/admin/dashboard', None),
+    ('admin_users', 20, 'GET', lambda c: '/admin/users', None),
+    ('admin_products', 20, 'GET', lambda c: '/admin/products', None),
+    ('admin_orders', 20, 'GET', lambda c: '/admin/orders', None),
+]
+
+API_SHOPPER = [
+    ('api_products', 35, 'GET', lambda c: '/api/v1/products', None),
+    ('api_products_batch', 20, 'GET',
+     lambda c: '/api/v1/products?ids=' + ','.join(str(c.product_id()) for _ in range(20)), None),
+    ('api_cart', 20, 'GET', lambda c: '/api/v1/cart', None),
+    ('api_cart_add', 10, 'POST', lambda c: '/api/v1/cart/items',
+     lambda c: {'items': [{'product_id': c.product_id()} for _ in range(3)]}),
+    ('api_orders', 15, 'GET', lambda c: '/api/v1/orders', None),
+]
+
+ROLES = {
+    'shopper': {'actions': SHOPPER, 'login': '/login', 'username': 'user{n}'},
+    'merchant': {'actions': MERCHANT, 'login': '/merchant/login', 'username': 'merchant{n}'},
+    'admin': {'actions': ADMIN, 'login': '/admin/login', 'username': 'admin0'},
+    'api': {'actions': API_SHOPPER, 'login': '/login', 'username': 'user{n}'},
+}
+
+# Share of simulated clients per role
+MIXES = {
+    'realistic': {'shopper': 90, 'merchant': 9, 'admin': 1},
+    'shopper': {'shopper': 100},
+    'merchant': {'merchant': 100},
+    'admin': {'admin': 100},
+    'api': {'api': 100},
+}
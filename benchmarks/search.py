@@ -0,0 +1,37 @@
+# app/benchmarks/search.py
+# Full-text search latency over a large catalog:
+#   python -m app.benchmarks.search --products 1000000
+import argparse
+import json
+
+from app.benchmarks import make_app, seed_merchant, seed_products, time_requests
+from app.search import rebuild_index
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(args.products, merchant.id)
+        rebuild_index()
+
+    client = app.test_client()
+    queries = {
+        'exact': '/search?q=Product+0004242',
+        'prefix': '/search?q=Product+00042',
+        'filtered': '/search?q=Product+0001&min_price=10&max_price=500&in_stock=1',
+        'no_match': '/search?q=zzzzzz',
+    }
+    results = {'products': args.products}
+    for name, url in queries.items():
+        results[name] = time_requests(client, url, args.repeat)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+# app/benchmarks/serving.py
+# The storefront reads (/, /cart, /orders) served by the WSGI app under
+# gunicorn's threaded worker versus the ASGI app (app/asgi.py) under
+# uvicorn, with many simultaneous keep-alive clients. --trickle-ms makes
+# them slow: the request line goes out, the headers follow that much later.
+#   python -m app.benchmarks.serving --clients 1000 --seconds 20 --threads 8
+#   python -m app.benchmarks.serving --clients 1000 --think-ms 2000 --trickle-ms 200
+# Needs gunicorn, uvicorn, aiosqlite and greenlet installed.
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from flask_login import login_user
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import make_app, seed_merchant, seed_products
+from app.extensions import db
+from app.identity import SessionUser
+from app.models import Cart, Order, User
+
+USER_AGENT = 'serving-benchmark'
+PATHS = [('/', 0.6), ('/cart', 0.2), ('/orders', 0.2)]
+
+
+def seed(app, args):
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(args.products, merchant.id)
+        password = generate_password_hash('pw')
+        users = [User(username=f'shopper{i}', password=password, role='user', approved=True)
+                 for i in range(args.users)]
+        db.session.add_all(users)
+        db.session.flush()
+        for user in users:
+            for product_id in random.sample(range(1, args.products + 1), 3):
+                db.session.add(Cart(user_id=user.id, product_id=product_id, quantity=1))
+            for product_id in random.sample(range(1, args.products + 1), 10):
+                db.session.add(Order(user_id=user.id, product_id=product_id, quantity=1, unit_price=9.99,
+                                     product_name=f'Product {product_id:07d}', merchant_id=merchant.id))
+        db.session.commit()
+        return [SessionUser(u.id, u.username, u.role, u.approved) for u in users]
+
+
+def session_cookies(app, users):
+    # Signed as a real login would be, without a password hash per client
+    cookies = []
+    serializer = app.session_interface.get_signing_serializer(app)
+    for user in users:
+        with app.test_request_context(headers={'User-Agent': USER_AGENT},
+                                      environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            from flask import session
+            login_user(user)
+            cookies.append(f"{app.config['SESSION_COOKIE_NAME']}={serializer.dumps(dict(session))}")
+    return cookies
+
+
+def server_command(kind, port, args):
+    if kind == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '--worker-class', args.wsgi_worker,
+                '--workers', str(args.workers), '--threads', str(args.threads),
+                '--worker-connections', str(args.clients * 2), '--keep-alive', '75',
+                '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:create_app()']
+    return [sys.executable, '-m', 'uvicorn', '--factory', 'app.asgi:create_asgi_app',
+            '--workers', str(args.workers), '--timeout-keep-alive', '75', '--no-access-log',
+            '--port', str(port), '--log-level', 'warning']
+
+
+def start_server(kind, uri, port, args):
+    import app as package
+    root = os.path.dirname(os.path.dirname(os.path.abspath(package.__file__)))
+    env = dict(os.environ, DATABASE_URL=uri, APP_CONFIG='production', APP_SERVING='1',
+               PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    server = subprocess.Popen(server_command(kind, port, args), env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'{kind} server did not start')
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length, chunked, keep_alive = None, False, True
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+        elif name == 'connection' and 'close' in value.lower():
+            keep_alive = False
+    if chunked:
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def client(port, cookie, deadline, args, latencies, errors):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        errors['connect'] += 1
+        return
+    paths, weights = zip(*PATHS)
+    # Spread the first requests out instead of starting with a burst
+    await asyncio.sleep(random.uniform(0, args.think_ms / 1000))
+    try:
+        while time.perf_counter() < deadline:
+            path = random.choices(paths, weights)[0]
+            started = time.perf_counter()
+            writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+            if args.trickle_ms:
+                await writer.drain()
+                await asyncio.sleep(args.trickle_ms / 1000)
+            writer.write(f'Host: 127.0.0.1\r\nUser-Agent: {USER_AGENT}\r\n'
+                         f'Cookie: {cookie}\r\nConnection: keep-alive\r\n\r\n'.encode())
+            status, keep_alive = await read_response(reader)
+            latencies.append((path, time.perf_counter() - started))
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+            if not keep_alive:      # e.g. gunicorn's sync worker
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            if args.think_ms:
+                await asyncio.sleep(random.uniform(0, 2 * args.think_ms / 1000))
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+        errors['dropped'] += 1
+    finally:
+        writer.close()
+
+
+async def load(port, cookies, args):
+    latencies, errors = [], {'connect': 0, 'dropped': 0}
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(client(port, cookies[i % len(cookies)], deadline, args, latencies, errors)
+                           for i in range(args.clients)))
+    return latencies, errors
+
+
+def run(kind, uri, cookies, port, args):
+    server = start_server(kind, uri, port, args)
+    try:
+        started = time.perf_counter()
+        latencies, errors = asyncio.run(load(port, cookies, args))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    result = {
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        **percentiles([seconds for _, seconds in latencies]),
+        'errors': {key: count for key, count in errors.items() if count},
+    }
+    for path, _ in PATHS:
+        result[path] = percentiles([seconds for p, seconds in latencies if p == path])
+    return result
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=1000, help='simultaneous keep-alive connections')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--think-ms', type=float, default=1000, help='mean pause between a client\'s requests')
+    parser.add_argument('--trickle-ms', type=float, default=0, help='delay between request line and headers')
+    parser.add_argument('--workers', type=int, default=1, help='server processes for both servers')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--wsgi-worker', default='gthread', help='gunicorn worker class (gthread, sync)')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--port', type=int, default=8760)
+    args = parser.parse_args()
+
+    missing = [name for name in ('gunicorn', 'uvicorn', 'aiosqlite', 'greenlet')
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        sys.exit(f"pip install {' '.join(missing)} to run this benchmark")
+
+    # One socket per client here and in the server
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.clients * 2 + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    app = make_app()
+    cookies = session_cookies(app, seed(app, args))
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+
+    results = {key: getattr(args, key)
+               for key in ('clients', 'seconds', 'think_ms', 'trickle_ms', 'workers', 'threads', 'wsgi_worker')}
+    for offset, kind in enumerate(('wsgi', 'asgi')):
+        results[kind] = run(kind, uri, cookies, args.port + offset, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
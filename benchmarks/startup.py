@@ -0,0 +1,122 @@
+# app/benchmarks/startup.py
+# Cold start of a worker process, default vs serving mode (APP_SERVING=1):
+# import time, create_app(), time-to-first-request and RSS per worker, plus an
+# import-time breakdown by package (python -X importtime):
+#   python -m app.benchmarks.startup --workers 8
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from app.benchmarks import make_app, seed_merchant, seed_products
+
+# Runs in a fresh interpreter, like a gunicorn worker after fork/exec
+WORKER = r'''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+created = time.perf_counter()
+client = app.test_client()
+status = client.get('/').status_code
+first = time.perf_counter()
+client.get('/admin/login')
+admin = time.perf_counter()
+
+def rss_kb():
+    with open('/proc/self/status') as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+print(json.dumps({
+    'status': status,
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'first_admin_request_ms': (admin - first) * 1000,
+    'rss_kb': rss_kb(),
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def package_root():
+    import app
+    return os.path.dirname(os.path.dirname(os.path.abspath(app.__file__)))
+
+
+def worker_env(serving):
+    env = dict(os.environ, APP_CONFIG='production', APP_SERVING='1' if serving else '0')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root(), env.get('PYTHONPATH')]))
+    return env
+
+
+def start_worker(uri, serving):
+    # Wall time covers interpreter start-up too, which the worker can't see
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', WORKER, uri], env=worker_env(serving),
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output)
+    result['spawn_to_first_response_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def import_breakdown(serving, top):
+    # `-X importtime` reports self time per module in microseconds on stderr
+    code = 'from app import create_app; create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})'
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=worker_env(serving),
+                            capture_output=True, text=True, check=True).stderr
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        # Our own modules individually, everything else by top-level package
+        group = '.'.join(name.split('.')[:2]) if name.startswith('app.') or name == 'app' else name.split('.')[0]
+        totals[group] += int(self_us)
+    ranked = sorted(totals.items(), key=lambda item: -item[1])
+    return {
+        'total_ms': round(sum(totals.values()) / 1000, 1),
+        'top': {name: round(us / 1000, 1) for name, us in ranked[:top]},
+    }
+
+
+def summarize(runs):
+    keys = [key for key in runs[0] if key != 'status']
+    summary = {key: round(statistics.median(run[key] for run in runs), 1) for key in keys}
+    summary['rss_mb'] = round(summary.pop('rss_kb') / 1024, 1)
+    summary['errors'] = sum(run['status'] != 200 for run in runs)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8, help='cold starts per mode')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--top', type=int, default=15, help='packages in the import breakdown')
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_products(args.products, seed_merchant().id)
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+
+    results = {'workers': args.workers, 'products': args.products}
+    for label, serving in (('default', False), ('serving', True)):
+        runs = [start_worker(uri, serving) for _ in range(args.workers)]
+        results[label] = summarize(runs)
+        results[label]['import_breakdown'] = import_breakdown(serving, args.top)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# app/benchmarks/stock_contention.py
+# Fires concurrent purchases at a single product and checks that stock is
+# never lost or driven negative:
+#   python -m app.benchmarks.stock_contention --buyers 50 --purchases 2000
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from app.benchmarks import make_app, seed_merchant, seed_products
+from app.extensions import db
+from app.models import Order, Product, User
+
+
+def run(buyers=50, purchases=2000, stock=500, threads=32):
+    app = make_app()
+    with app.app_context():
+        merchant = seed_merchant()
+        seed_products(1, merchant.id)
+        product = db.session.get(Product, 1)
+        product.stock = stock
+        password = generate_password_hash('pw')
+        db.session.add_all(User(username=f'buyer{i}', password=password, role='user', approved=True)
+                           for i in range(buyers))
+        db.session.commit()
+
+    # One logged-in test client per buyer, reused by whichever thread holds it
+    local = threading.local()
+
+    def purchase(n):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            local.client.post('/login', data={'username': f'buyer{n % buyers}', 'password': 'pw'})
+        response = local.client.post('/buy_now/1', data={'quantity': 1 + n % 3})
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(purchase, range(purchases)))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        final_stock = db.session.get(Product, 1).stock
+        sold = db.session.scalar(db.select(db.func.coalesce(db.func.sum(Order.quantity), 0)))
+
+    return {
+        'purchases': purchases,
+        'threads': threads,
+        'seconds': round(elapsed, 3),
+        'errors': sum(1 for status in statuses if status >= 500),
+        'initial_stock': stock,
+        'units_sold': sold,
+        'final_stock': final_stock,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buyers', type=int, default=50)
+    parser.add_argument('--purchases', type=int, default=2000)
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    result = run(args.buyers, args.purchases, args.stock, args.threads)
+    print(json.dumps(result, indent=2))
+    assert result['final_stock'] >= 0, "stock went negative"
+    assert result['final_stock'] + result['units_sold'] == args.stock, "stock was lost or double-counted"
+
+
+if __name__ == '__main__':
+    main()
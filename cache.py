@@ -0,0 +1,378 @@
+# app/cache.py
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, has_request_context
+
+from .extensions import db
+from .models import CatalogVersion
+
+
+class MemoryCache:
+    """In-process LRU cache with a per-entry TTL.
+
+    Each worker process has its own copy, so a write in one worker only
+    reaches the others once their entries expire. Use the redis backend
+    when several workers must see invalidations immediately.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def set_many(self, items):
+        for key, value in items:
+            self.set(key, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Shared cache backed by a (local) redis server; requires `redis`."""
+
+    def __init__(self, url, ttl=300, prefix='ecom:'):
+        import redis  # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return [pickle.loads(raw) if raw is not None else None
+                for raw in self.client.mget([self.prefix + key for key in keys])]
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+
+    def set_many(self, items):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in items:
+            pipeline.set(self.prefix + key, pickle.dumps(value), ex=self.ttl)
+        pipeline.execute()
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def delete_many(self, keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def get_many(self, keys):
+        return [None] * len(keys)
+
+    def set(self, key, value):
+        pass
+
+    def set_many(self, items):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def delete_many(self, keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def make_backend(app, ttl, max_entries, prefix='ecom:'):
+    kind = app.config.get('CACHE_BACKEND', 'memory')   # memory | redis | null
+    if kind == 'memory':
+        return MemoryCache(max_entries, ttl)
+    if kind == 'redis':
+        return RedisCache(app.config['CACHE_URL'], ttl, prefix)
+    return NullCache()
+
+
+class CatalogCache:
+    """Read-through cache for catalog reads.
+
+    Keys are namespaced by the catalog generation; every write to what a
+    page lists (names, prices, products added or removed) bumps it, so all
+    entries that could contain the changed product become unreachable at
+    once and age out of the LRU. Stock-only writes touch() the products
+    they changed instead: pages stay cached and only those products' stock
+    entries (see stock()) are dropped. Generation, stock generation and the
+    time of the last write live in the catalog_version row, so every
+    worker, the job worker and CLI commands agree on them. They double as
+    the catalog version behind the storefront's ETag/Last-Modified headers.
+
+    The backends, counters and version memo belong to the app, in
+    app.extensions['catalog_cache'].
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memory')    # memory | redis | null
+        app.config.setdefault('CACHE_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('CACHE_TTL', 300)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        # How stale another process's writes may look here
+        app.config.setdefault('CATALOG_VERSION_TTL', 1.0)
+        # Per-product stock entries; the TTL bounds how long a redis entry
+        # written by a read racing another worker's sale can be served
+        app.config.setdefault('CATALOG_STOCK_TTL', 30)
+        app.config.setdefault('CATALOG_STOCK_MAX_ENTRIES', 100000)
+
+        app.extensions['catalog_cache'] = {
+            'backend': make_backend(app, app.config['CACHE_TTL'], app.config['CACHE_MAX_ENTRIES']),
+            'stock': make_backend(app, app.config['CATALOG_STOCK_TTL'],
+                                  app.config['CATALOG_STOCK_MAX_ENTRIES'], 'ecom:stock:'),
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'version': None,            # (generation, modified), read at most every
+            'version_expires': 0.0,     # CATALOG_VERSION_TTL seconds
+            'version_ttl': app.config['CATALOG_VERSION_TTL'],
+            'stock_generation': None,   # as of the last version read
+            'own_stock_writes': 0,      # stock commits from this process since then
+            'stock_epoch': 0,           # moves whenever stock entries are dropped
+            'started': int(time.time()),
+        }
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['catalog_cache']
+
+    @property
+    def versioned(self):
+        # With caching off (null backend) pages carry no validators either
+        return not isinstance(self._state()['backend'], NullCache)
+
+    @property
+    def remote(self):
+        # Backend calls are network round trips (async views run them off the loop)
+        return isinstance(self._state()['backend'], RedisCache)
+
+    def version(self):
+        """(generation, unix time of the last write), as last committed.
+
+        A request keeps the version it first saw, so its cache keys and
+        validators agree (and an async view that read it never blocks).
+        """
+        if self.version_due():
+            # Own connection: sees committed writes only, whatever the
+            # request's session has pending
+            with db.engine.connect() as connection:
+                self.set_version(connection.execute(self.version_statement()).first())
+        if has_request_context():
+            return g.setdefault('catalog_version', self._state()['version'])
+        return self._state()['version']
+
+    def version_due(self):
+        if has_request_context() and 'catalog_version' in g:
+            return False
+        state = self._state()
+        return state['version'] is None or time.monotonic() >= state['version_expires']
+
+    @staticmethod
+    def version_statement():
+        return (db.select(CatalogVersion.generation, CatalogVersion.modified,
+                          CatalogVersion.stock_generation)
+                .where(CatalogVersion.id == 1))
+
+    def set_version(self, row):
+        """Take a version_statement() row read elsewhere (e.g. by an async view)."""
+        state = self._state()
+        # No write yet: anything already there predates this process
+        generation, modified, stock_generation = row if row is not None else (0, state['started'], 0)
+        self._check_stock_generation(state, stock_generation)
+        state['version'] = (generation, modified)
+        state['version_expires'] = time.monotonic() + state['version_ttl']
+        if has_request_context():
+            g.catalog_version = state['version']
+
+    @staticmethod
+    def _check_stock_generation(state, stock_generation):
+        # Stock writes from other processes only show up as a bigger stock
+        # generation. Redis entries were dropped by the writer itself, but
+        # this process's memory entries can't say which products changed.
+        previous, own = state['stock_generation'], state['own_stock_writes']
+        state['stock_generation'], state['own_stock_writes'] = stock_generation, 0
+        if (previous is not None and stock_generation != previous + own
+                and isinstance(state['stock'], MemoryCache)):
+            state['stock'].clear()
+            state['stock_epoch'] += 1
+
+    def generation(self):
+        return self.version()[0]
+
+    def last_modified(self):
+        return self.version()[1]
+
+    def lookup(self, key):
+        """Return (full_key, value or None) for the current generation.
+
+        Store a freshly loaded value under the returned full_key, so a write
+        that lands while it loads cannot leave it cached as current.
+        """
+        full_key = f'catalog:{self.generation()}:{key}'
+        state = self._state()
+        value = state['backend'].get(full_key)
+        if value is not None:
+            state['hits'] += 1
+        else:
+            state['misses'] += 1
+        return full_key, value
+
+    def store(self, full_key, value):
+        self._state()['backend'].set(full_key, value)
+
+    def get_or_load(self, key, loader):
+        full_key, value = self.lookup(key)
+        if value is None:
+            value = loader()
+            self.store(full_key, value)
+        return value
+
+    # ------------------ Per-product stock ------------------
+    def stock_epoch(self):
+        """Take this before reading stock; pass it to store_stock() with
+        what was loaded, so a sale committed meanwhile isn't undone."""
+        self.version()      # picks up other processes' stock writes
+        return self._state()['stock_epoch']
+
+    def stock(self, product_ids):
+        """{product_id: (stock, reserved, version)} for the ids with a cached entry."""
+        product_ids = list(product_ids)
+        values = self._state()['stock'].get_many([str(product_id) for product_id in product_ids])
+        return {product_id: value for product_id, value in zip(product_ids, values) if value is not None}
+
+    def store_stock(self, epoch, values):
+        state = self._state()
+        if values and state['stock_epoch'] == epoch:
+            state['stock'].set_many([(str(product_id), value) for product_id, value in values.items()])
+
+    def invalidate(self):
+        """Bump the catalog version in the current transaction.
+
+        Call before committing the product write, so the bump commits (or
+        rolls back) with it. This app re-reads the version, and drops its
+        stock entries, once the session commits.
+        """
+        self._state()['invalidations'] += 1
+        self._write_version(generation=CatalogVersion.generation + 1,
+                            stock_generation=CatalogVersion.stock_generation + 1)
+        db.session.info['catalog_stock'] = None         # all of it
+
+    def touch(self, product_ids):
+        """Record a stock-only change (holds, sales, restocks) to `product_ids`.
+
+        Cached pages stay valid; only these products' stock entries are
+        dropped, and Last-Modified moves on. inventory.py calls this for
+        every stock write, in the transaction making it.
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+        info = db.session.info
+        if 'catalog_stock' not in info:
+            # One version bump per transaction, however many writes it holds
+            self._write_version(stock_generation=CatalogVersion.stock_generation + 1)
+            info['catalog_stock'] = set()
+        if info['catalog_stock'] is not None:
+            info['catalog_stock'].update(product_ids)
+
+    def _write_version(self, **values):
+        now = int(time.time())
+        bumped = db.session.execute(
+            db.update(CatalogVersion).where(CatalogVersion.id == 1).values(modified=now, **values)
+        ).rowcount
+        if not bumped:
+            db.session.execute(db.insert(CatalogVersion).values(
+                id=1, modified=now, generation=int('generation' in values),
+                stock_generation=int('stock_generation' in values)))
+        db.session.info['catalog_invalidated'] = self._state()
+
+    @staticmethod
+    def _after_commit(session):
+        state = session.info.pop('catalog_invalidated', None)
+        if state is None:
+            return
+        if 'catalog_stock' in session.info:
+            touched = session.info.pop('catalog_stock')
+            if touched is None:
+                state['stock'].clear()
+            else:
+                state['stock'].delete_many([str(product_id) for product_id in touched])
+            state['own_stock_writes'] += 1
+            state['stock_epoch'] += 1
+        state['version'] = None
+        if has_request_context():
+            g.pop('catalog_version', None)
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('catalog_invalidated', None)
+        session.info.pop('catalog_stock', None)
+
+    def stats(self):
+        state = self._state()
+        lookups = state['hits'] + state['misses']
+        return {
+            'backend': type(state['backend']).__name__,
+            'hits': state['hits'],
+            'misses': state['misses'],
+            'hit_rate': state['hits'] / lookups if lookups else 0.0,
+            'invalidations': state['invalidations'],
+        }
+
+
+catalog_cache = CatalogCache()
+db.event.listen(db.session, 'after_commit', catalog_cache._after_commit)
+db.event.listen(db.session, 'after_rollback', catalog_cache._after_rollback)
@@ -0,0 +1,83 @@
+# app/carts.py
+# Cart changes shared by the HTML and JSON views. With CART_HOLD_MINUTES
+# set, adding to a cart also holds the units (Product.reserved) until the
+# hold expires and the sweep_holds job gives them back.
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from . import tasks
+from .extensions import db
+from .inventory import hold_stock_bulk, release_holds, sweep_expired_holds
+from .models import Cart, Product
+
+
+def cart_contents(user_id):
+    """A user's cart lines with the product name and price joined in."""
+    return (db.select(Cart)
+            .where(Cart.user_id == user_id)
+            .options(db.joinedload(Cart.product).load_only(Product.id, Product.name, Product.price)))
+
+
+def add_items(user_id, quantities):
+    """Add {product_id: units} to a user's cart; all or nothing.
+
+    Returns the product ids that are missing or short. The caller rolls
+    back if there are any, otherwise commits and invalidates the catalog.
+    """
+    ids = list(quantities)
+    available = dict(db.session.execute(
+        db.select(Product.id, Product.available).where(Product.id.in_(ids))).all())
+    existing = {item.product_id: item for item in
+                Cart.query.filter(Cart.user_id == user_id, Cart.product_id.in_(ids))}
+
+    # Units already in the cart but not held still need to be available
+    def unheld(product_id):
+        item = existing.get(product_id)
+        return item.quantity - item.held if item else 0
+
+    short = [product_id for product_id, quantity in quantities.items()
+             if available.get(product_id, 0) < quantity + unheld(product_id)]
+    if short:
+        return short
+
+    minutes = current_app.config['CART_HOLD_MINUTES']
+    if minutes and not hold_stock_bulk(quantities):
+        return ids                      # lost a race since the read above
+    expires_at = datetime.utcnow() + timedelta(minutes=minutes)
+
+    for product_id, quantity in quantities.items():
+        item = existing.get(product_id)
+        if item is None:
+            item = Cart(user_id=user_id, product_id=product_id, quantity=0, held=0)
+            db.session.add(item)
+        item.quantity += quantity
+        if minutes:
+            item.held += quantity
+            item.hold_expires_at = expires_at
+    if minutes:
+        tasks.holds_placed(expires_at)
+    return []
+
+
+def remove_items(user_id, product_ids=None):
+    """Delete cart lines (all of them when product_ids is None), releasing
+    their holds; returns True if any held units went back on sale."""
+    conditions = [Cart.user_id == user_id]
+    if product_ids is not None:
+        conditions.append(Cart.product_id.in_(product_ids))
+    released = release_holds(*conditions)
+    db.session.execute(db.delete(Cart).where(*conditions))
+    return bool(released)
+
+
+@click.command('holds-sweep')
+def sweep_command():
+    """Release expired cart holds now (the job queue also does this)."""
+    released = sweep_expired_holds()
+    click.echo(f"Released {released} expired holds.")
+
+
+def init_app(app):
+    app.cli.add_command(sweep_command)
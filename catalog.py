@@ -0,0 +1,247 @@
+# app/catalog.py
+import base64
+import hashlib
+import json
+import math
+from datetime import datetime, timezone
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+from .cache import catalog_cache
+from .extensions import db
+from .models import Product
+
+# Storefront orderings: sort key -> column walked by the keyset cursor.
+# 'newest' walks the primary key backwards; the others walk (column, id)
+# forwards using the composite indexes declared on Product.
+SORT_OPTIONS = {
+    'newest': None,
+    'price': Product.price,
+    'name': Product.name,
+}
+DEFAULT_SORT = 'newest'
+
+
+# Ids outside SQLite's 64-bit integer range can't even be bound
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+
+
+def pack_cursor(value, last_id):
+    raw = json.dumps([value, last_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def encode_cursor(product, sort):
+    column = SORT_OPTIONS[sort]
+    value = getattr(product, column.key) if column is not None else None
+    return pack_cursor(value, product.id)
+
+
+def _valid_value(column, value):
+    # The value is bound against `column` in the keyset comparison
+    if column is None:
+        return True                     # 'newest' only uses the id
+    if column.type.python_type is float:
+        return (isinstance(value, (int, float)) and not isinstance(value, bool)
+                and math.isfinite(value))
+    return isinstance(value, column.type.python_type)
+
+
+def decode_cursor(cursor, sort=None):
+    """Return (value, last_id), or None for a malformed or tampered cursor,
+    which simply restarts from the first page. With `sort`, the value must
+    also suit that sort's column."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = int(last_id)
+    except (ValueError, TypeError):
+        return None
+    if not MIN_ID <= last_id <= MAX_ID:
+        return None
+    if sort is not None and not _valid_value(SORT_OPTIONS[sort], value):
+        return None
+    return value, last_id
+
+
+def page_statement(sort=DEFAULT_SORT, cursor=None, per_page=20, statement=None):
+    """SELECT for one keyset page of the catalog (one extra row, see split_page)."""
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    column = SORT_OPTIONS[sort]
+    statement = statement if statement is not None else db.select(Product)
+    after = decode_cursor(cursor, sort) if cursor else None
+
+    if column is None:
+        if after:
+            statement = statement.where(Product.id < after[1])
+        statement = statement.order_by(Product.id.desc())
+    else:
+        if after:
+            statement = statement.where(db.tuple_(column, Product.id) > db.tuple_(after[0], after[1]))
+        statement = statement.order_by(column, Product.id)
+
+    # Fetch one extra row to learn whether another page exists
+    return statement.limit(per_page + 1)
+
+
+def split_page(products, sort=DEFAULT_SORT, per_page=20):
+    """Return (products, next_cursor) from the rows page_statement fetched."""
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    next_cursor = None
+    if len(products) > per_page:
+        products = products[:per_page]
+        next_cursor = encode_cursor(products[-1], sort)
+    return products, next_cursor
+
+
+def product_page(sort=DEFAULT_SORT, cursor=None, per_page=20, query=None):
+    """Return (products, next_cursor) for one keyset page of the catalog."""
+    statement = page_statement(sort, cursor, per_page,
+                               query.statement if query is not None else None)
+    products = db.session.scalars(statement).all()
+    return split_page(products, sort, per_page)
+
+
+# ------------------ Cached reads ------------------
+# Cached values are plain dicts (not ORM objects) so they can be shared
+# across requests and pickled for the redis backend. Templates read them
+# with the same attribute syntax as Product instances.
+#
+# Stock moves with every cart hold and sale, which only bump the product's
+# version, not the catalog generation. Cached rows therefore keep the
+# name/price/order of a page, and their stock fields come from the
+# per-product stock cache (catalog_cache.stock()), which inventory.py
+# touches on every stock write. Only products missing from it are read,
+# in one primary-key query (live_statement).
+CACHED_FIELDS = ('id', 'name', 'price', 'stock', 'available', 'merchant_id', 'version')
+STOCK_BATCH = 500       # more missing products than this: read them all
+
+
+def as_row(product):
+    return {field: getattr(product, field) for field in CACHED_FIELDS}
+
+
+def live_statement(product_ids=None):
+    """Current stock fields for `product_ids` (all products if None)."""
+    statement = db.select(Product.id, Product.stock, Product.reserved, Product.version)
+    if product_ids is not None:
+        statement = statement.where(Product.id.in_(product_ids))
+    return statement
+
+
+def missing_stock(rows, stock):
+    """live_statement() for the rows without a stock entry, or None."""
+    missing = [row['id'] for row in rows if row['id'] not in stock]
+    if not missing:
+        return None
+    return live_statement(missing if len(missing) <= STOCK_BATCH else None)
+
+
+def add_stock_rows(stock, epoch, loaded):
+    """Merge live_statement() results into `stock` and cache them."""
+    loaded = {product_id: (units, reserved, version) for product_id, units, reserved, version in loaded}
+    catalog_cache.store_stock(epoch, loaded)
+    stock.update(loaded)
+
+
+def with_stock(rows, stock):
+    """Copies of cached `rows` carrying `stock` ({id: (stock, reserved, version)}).
+
+    Rows whose product has gone are dropped.
+    """
+    fresh = []
+    for row in rows:
+        if row['id'] in stock:
+            units, reserved, version = stock[row['id']]
+            fresh.append(dict(row, stock=units, available=units - reserved, version=version))
+    return fresh
+
+
+def with_current_stock(rows):
+    epoch = catalog_cache.stock_epoch()
+    stock = catalog_cache.stock(row['id'] for row in rows)
+    statement = missing_stock(rows, stock)
+    if statement is not None:
+        add_stock_rows(stock, epoch, db.session.execute(statement))
+    return with_stock(rows, stock)
+
+
+def stock_rows(rows):
+    """Stock cache entries for freshly loaded rows."""
+    return [(row['id'], row['stock'], row['stock'] - row['available'], row['version']) for row in rows]
+
+
+def stock_stamp(rows):
+    """Part of the ETag for a page of rows; changes with any of their versions."""
+    return ','.join(f"{row['id']}.{row['version']}" for row in rows)
+
+
+def page_key(sort, cursor, per_page):
+    return f'page:{sort}:{per_page}:{cursor or ""}'
+
+
+def cached_product_page(sort=DEFAULT_SORT, cursor=None, per_page=20):
+    full_key, page = catalog_cache.lookup(page_key(sort, cursor, per_page))
+    if page is None:
+        epoch = catalog_cache.stock_epoch()
+        products, next_cursor = product_page(sort=sort, cursor=cursor, per_page=per_page)
+        page = [as_row(p) for p in products], next_cursor
+        catalog_cache.store(full_key, page)
+        add_stock_rows({}, epoch, stock_rows(page[0]))
+        return page
+    rows, next_cursor = page
+    return with_current_stock(rows), next_cursor
+
+
+def cached_all_products():
+    full_key, rows = catalog_cache.lookup('all')
+    if rows is None:
+        epoch = catalog_cache.stock_epoch()
+        rows = [as_row(p) for p in Product.query.order_by(Product.id).all()]
+        catalog_cache.store(full_key, rows)
+        add_stock_rows({}, epoch, stock_rows(rows))
+        return rows
+    return with_current_stock(rows)
+
+
+def catalog_response(render, stamp=''):
+    """Serve a catalog page with validators derived from the catalog version
+    and `stamp` (see stock_stamp) for the rows on it.
+
+    A request whose If-None-Match/If-Modified-Since still matches gets a
+    304 without rendering. Anonymous pages are also cached whole, so a
+    reverse proxy or new visitor costs no Jinja until a product on the
+    page, or the catalog version, changes.
+    """
+    if not catalog_cache.versioned or '_flashes' in session:
+        return render()
+
+    anonymous = not current_user.is_authenticated
+    viewer = 'anonymous' if anonymous else current_user.get_id()
+    stamp = hashlib.sha1(stamp.encode()).hexdigest()
+    etag = hashlib.sha1(
+        f'{catalog_cache.generation()}:{stamp}:{viewer}:{request.full_path}'.encode()).hexdigest()
+    modified = datetime.fromtimestamp(catalog_cache.last_modified(), timezone.utc)
+
+    if is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        if anonymous:
+            response = make_response(catalog_cache.get_or_load(f'html:{stamp}:{request.full_path}', render))
+        else:
+            response = make_response(render())
+    else:
+        response = current_app.response_class(status=304)
+
+    response.set_etag(etag)
+    response.last_modified = modified
+    if anonymous:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['CATALOG_MAX_AGE']
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
@@ -0,0 +1,86 @@
+# app/config.py
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'secretkey')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///../database.db')
+
+    # Connection pool (QueuePool is used for file databases and servers alike)
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+
+    # Applied to every new SQLite connection; an empty dict keeps SQLite defaults
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT', 5000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'foreign_keys': 'ON',
+    }
+
+    PRODUCTS_PER_PAGE = 24
+    # max-age for anonymous catalog pages; 0 makes shared caches revalidate
+    # with the ETag on every request
+    CATALOG_MAX_AGE = _env_int('CATALOG_MAX_AGE', 0)
+
+    # Adding to a cart holds the units for this long; 0 turns holds off
+    CART_HOLD_MINUTES = _env_int('CART_HOLD_MINUTES', 15)
+
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto/-Host
+    # are trusted (werkzeug ProxyFix). Leave 0 when clients connect directly:
+    # anyone could then pick their own address for the per-IP login limit.
+    TRUSTED_PROXIES = _env_int('TRUSTED_PROXIES', 0)
+
+    # Background jobs: inline runs them after the response instead of in a
+    # separate `flask jobs-worker` process.
+    JOBS_INLINE = os.environ.get('JOBS_INLINE', '0') == '1'
+
+    # Serving workers (gunicorn etc.): skip migration tooling and defer the
+    # admin blueprint's import until an admin page is first requested.
+    # `flask db ...` needs this off.
+    SERVING = os.environ.get('APP_SERVING', '0') == '1'
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    JOBS_INLINE = os.environ.get('JOBS_INLINE', '1') == '1'
+
+
+class ProductionConfig(Config):
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 20)
+
+
+class TestingConfig(Config):
+    TESTING = True
+    JOBS_INLINE = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def engine_options(config):
+    # Pool sizing only applies to pooled engines; in-memory SQLite uses a
+    # single static connection.
+    options = {'pool_pre_ping': True}
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri not in ('sqlite://', 'sqlite:///:memory:'):
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    return options
@@ -1,7 +1,109 @@
 # app/extensions.py
+import threading
+import time
+
+from flask import g, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 
+
+def configure_sqlite(app, engine=None):
+    """Apply SQLITE_PRAGMAS (WAL, busy timeout, mmap...) to every new connection.
+
+    `engine` defaults to the app's engine; the ASGI server passes the sync
+    side of its async engine.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if engine is None:
+        with app.app_context():
+            engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @db.event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+class SQLInstrumentation:
+    """Opt-in per-request SQL counters (SQL_INSTRUMENTATION = True).
+
+    Counts queries and SQL time per request, aggregates them per endpoint,
+    logs statements slower than SLOW_QUERY_MS and adds a Server-Timing
+    header to every response.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_INSTRUMENTATION', False)
+        app.config.setdefault('SLOW_QUERY_MS', 100)
+        if not app.config['SQL_INSTRUMENTATION']:
+            return
+
+        state = app.extensions['sql_instrumentation'] = {'lock': threading.Lock(), 'endpoints': {}}
+        with app.app_context():
+            self.watch(app, db.engine)
+
+        @app.before_request
+        def start_sql_counters():
+            g.sql_counters = [0, 0.0]
+
+        @app.after_request
+        def record_sql_counters(response):
+            queries, sql_ms = g.pop('sql_counters', (0, 0.0))
+            endpoint = request.endpoint or 'unknown'
+            with state['lock']:
+                stats = state['endpoints'].setdefault(
+                    endpoint, {'requests': 0, 'queries': 0, 'sql_ms': 0.0, 'max_queries': 0})
+                stats['requests'] += 1
+                stats['queries'] += queries
+                stats['sql_ms'] += sql_ms
+                stats['max_queries'] = max(stats['max_queries'], queries)
+            response.headers.add('Server-Timing', f'db;desc="{queries} queries";dur={sql_ms:.2f}')
+            return response
+
+    @staticmethod
+    def watch(app, engine):
+        """Count and time statements run on `engine` (a no-op unless enabled)."""
+        if 'sql_instrumentation' not in app.extensions:
+            return
+        slow_ms = app.config['SLOW_QUERY_MS']
+
+        @db.event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+        @db.event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed_ms = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+            if elapsed_ms >= slow_ms:
+                endpoint = request.endpoint if has_request_context() else None
+                app.logger.warning("Slow query (%.1f ms) in %s: %s %r",
+                                   elapsed_ms, endpoint, statement, parameters)
+            if has_request_context() and 'sql_counters' in g:
+                g.sql_counters[0] += 1
+                g.sql_counters[1] += elapsed_ms
+
+    @staticmethod
+    def snapshot(app):
+        state = app.extensions.get('sql_instrumentation')
+        if state is None:
+            return None
+        with state['lock']:
+            rows = [dict(stats, endpoint=endpoint) for endpoint, stats in state['endpoints'].items()]
+        for row in rows:
+            row['avg_queries'] = row['queries'] / row['requests']
+            row['avg_sql_ms'] = row['sql_ms'] / row['requests']
+        return sorted(rows, key=lambda row: row['sql_ms'], reverse=True)
+
+
+sql_instrumentation = SQLInstrumentation()
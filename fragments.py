@@ -0,0 +1,102 @@
+# app/fragments.py
+# Cached HTML for product cards. The static part of a card depends only on
+# the product row, so it is rendered once per (id, version) and reused;
+# role-dependent buttons are passed in as the live body of a call block:
+#
+#   {% call product_card(p) %} ...buttons... {% endcall %}
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+CARD_TEMPLATE = 'partials/product_card.html'
+SLOT = '\x00slot\x00'       # split point for the live part of the card
+
+
+class FragmentCache:
+    """In-process LRU of rendered fragments, bounded by total size.
+
+    Each app keeps its own LRU in app.extensions['fragment_cache'].
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', 8 * 1024 * 1024)   # 0 disables it
+        app.add_template_global(self.product_card, 'product_card')
+        app.extensions['fragment_cache'] = {
+            'lock': threading.Lock(),
+            'data': OrderedDict(),
+            'size': 0,
+            'max_bytes': app.config['FRAGMENT_CACHE_MAX_BYTES'],
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['fragment_cache']
+
+    def get_or_render(self, key, render):
+        state = self._state()
+        data = state['data']
+        with state['lock']:
+            parts = data.get(key)
+            if parts is not None:
+                data.move_to_end(key)
+                state['hits'] += 1
+                return parts
+        state['misses'] += 1
+        parts = render()
+        size = sum(len(part) for part in parts)
+        if size > state['max_bytes']:
+            return parts
+        with state['lock']:
+            old = data.pop(key, None)
+            if old is not None:
+                state['size'] -= sum(len(part) for part in old)
+            data[key] = parts
+            state['size'] += size
+            while state['size'] > state['max_bytes']:
+                _, evicted = data.popitem(last=False)
+                state['size'] -= sum(len(part) for part in evicted)
+                state['evictions'] += 1
+        return parts
+
+    def product_card(self, product, caller=None):
+        def render():
+            html = current_app.jinja_env.get_template(CARD_TEMPLATE).render(p=product, slot=SLOT)
+            head, _, tail = html.partition(SLOT)
+            return head, tail
+
+        # A product's version changes on every write, so stale cards are
+        # simply never looked up again and fall out of the LRU
+        head, tail = self.get_or_render(('card', product['id'], product['version']), render)
+        return Markup(head) + (caller() if caller else '') + Markup(tail)
+
+    def clear(self):
+        state = self._state()
+        with state['lock']:
+            state['data'].clear()
+            state['size'] = 0
+            state['hits'] = state['misses'] = state['evictions'] = 0
+
+    def stats(self):
+        state = self._state()
+        lookups = state['hits'] + state['misses']
+        return {
+            'entries': len(state['data']),
+            'bytes': state['size'],
+            'max_bytes': state['max_bytes'],
+            'hits': state['hits'],
+            'misses': state['misses'],
+            'hit_rate': state['hits'] / lookups if lookups else 0.0,
+            'evictions': state['evictions'],
+        }
+
+
+fragment_cache = FragmentCache()
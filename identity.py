@@ -0,0 +1,91 @@
+# app/identity.py
+from flask import current_app
+from flask_login import UserMixin
+
+from .cache import NullCache, RedisCache, make_backend
+from .extensions import db
+from .models import User
+
+
+class SessionUser(UserMixin):
+    """Detached identity used as current_user; carries no ORM state."""
+
+    def __init__(self, id, username, role, approved):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.approved = approved
+
+    def __repr__(self):
+        return f'<SessionUser {self.id} {self.role}>'
+
+
+class IdentityCache:
+    """Short-TTL cache of (id, username, role, approved) for load_user.
+
+    Cached requests skip the user query entirely. Admin/merchant actions
+    that change an account call invalidate(); with the in-process backend
+    other workers pick the change up within IDENTITY_CACHE_TTL seconds.
+    The backend and counters live in app.extensions['identity_cache'].
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IDENTITY_CACHE_TTL', 60)         # 0 disables the cache
+        app.config.setdefault('IDENTITY_CACHE_MAX_ENTRIES', 10000)
+        ttl = app.config['IDENTITY_CACHE_TTL']
+        app.extensions['identity_cache'] = {
+            'backend': (make_backend(app, ttl, app.config['IDENTITY_CACHE_MAX_ENTRIES'], 'ecom:identity:')
+                        if ttl else NullCache()),
+            'hits': 0,
+            'misses': 0,
+        }
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['identity_cache']
+
+    @property
+    def enabled(self):
+        return not isinstance(self._state()['backend'], NullCache)
+
+    @property
+    def remote(self):
+        return isinstance(self._state()['backend'], RedisCache)
+
+    def statement(self, user_id):
+        return (db.select(User.id, User.username, User.role, User.approved)
+                .where(User.id == user_id, User.deleted_at.is_(None)))
+
+    def get(self, user_id):
+        state = self._state()
+        identity = state['backend'].get(f'user:{user_id}')
+        if identity is None:
+            state['misses'] += 1
+            return None
+        state['hits'] += 1
+        return SessionUser(**identity)
+
+    def add(self, row):
+        """Cache a row selected by statement() and return it as a SessionUser."""
+        identity = row._asdict()
+        self._state()['backend'].set(f"user:{identity['id']}", identity)
+        return SessionUser(**identity)
+
+    def load(self, user_id):
+        user = self.get(user_id)
+        if user is None:
+            row = db.session.execute(self.statement(user_id)).first()
+            user = self.add(row) if row is not None else None
+        return user
+
+    def invalidate(self, *user_ids):
+        backend = self._state()['backend']
+        for user_id in user_ids:
+            backend.delete(f'user:{user_id}')
+
+
+identity_cache = IdentityCache()
@@ -0,0 +1,134 @@
+# app/inventory.py
+from datetime import datetime
+
+from .cache import catalog_cache
+from .extensions import db
+from .models import Cart, Product
+
+# Stock is only ever changed with a single conditional UPDATE, never a
+# read-modify-write in Python, so concurrent buyers cannot oversell.
+# Every change also bumps Product.version so ORM-level edits made from a
+# stale copy (see merchant.update_product) fail instead of clobbering it.
+#
+# Product.reserved counts units held by carts (Cart.held); only
+# stock - reserved (Product.available) can be sold or held by anyone else.
+#
+# Each successful write also touches the catalog cache for the products it
+# changed, so storefront pages show the new stock once it commits.
+
+
+def reserve_stock(product_id, quantity):
+    """Take `quantity` units; returns False (and changes nothing) if short."""
+    result = db.session.execute(
+        db.update(Product)
+        .where(Product.id == product_id, Product.available >= quantity)
+        .values(stock=Product.stock - quantity, version=Product.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    catalog_cache.touch([product_id])
+    return True
+
+
+def add_stock(product_id, quantity):
+    result = db.session.execute(
+        db.update(Product)
+        .where(Product.id == product_id)
+        .values(stock=Product.stock + quantity, version=Product.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    catalog_cache.touch([product_id])
+    return True
+
+
+def reserve_stock_bulk(quantities, held=None):
+    """Take stock for several products in one UPDATE; all or nothing.
+
+    `quantities` maps product_id -> units. `held` maps product_id -> units
+    the buyer already holds; those are converted from reserved into sold.
+    Returns False if any product is short, in which case the caller must
+    roll back (no row was changed for the short products, but others may
+    have been).
+    """
+    if not quantities:
+        return True
+    wanted = db.case(quantities, value=Product.id)
+    held = {product_id: units for product_id, units in (held or {}).items() if units}
+    mine = db.case(held, value=Product.id, else_=0) if held else db.literal(0)
+    result = db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(list(quantities)), Product.available + mine >= wanted)
+        .values(stock=Product.stock - wanted, reserved=Product.reserved - mine,
+                version=Product.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    catalog_cache.touch(quantities)
+    return result.rowcount == len(quantities)
+
+
+# ------------------ Cart holds ------------------
+def hold_stock_bulk(quantities):
+    """Reserve units for a cart without selling them; all or nothing like
+    reserve_stock_bulk."""
+    if not quantities:
+        return True
+    wanted = db.case(quantities, value=Product.id)
+    result = db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(list(quantities)), Product.available >= wanted)
+        .values(reserved=Product.reserved + wanted, version=Product.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    catalog_cache.touch(quantities)
+    return result.rowcount == len(quantities)
+
+
+def release_holds(*conditions, limit=None):
+    """Give back the units held by the cart rows matching `conditions`.
+
+    The rows are locked first so a concurrent checkout cannot convert a
+    hold that is being released. Returns the number of rows released.
+    """
+    query = (db.select(Cart.id, Cart.product_id, Cart.held)
+             .where(Cart.held > 0, *conditions)
+             .with_for_update())
+    if limit:
+        query = query.order_by(Cart.hold_expires_at).limit(limit)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return 0
+
+    released = {}
+    for row in rows:
+        released[row.product_id] = released.get(row.product_id, 0) + row.held
+    db.session.execute(
+        db.update(Cart)
+        .where(Cart.id.in_([row.id for row in rows]))
+        .values(held=0, hold_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    give_back = db.case(released, value=Product.id)
+    db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(list(released)))
+        .values(reserved=Product.reserved - give_back, version=Product.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    catalog_cache.touch(released)
+    return len(rows)
+
+
+def sweep_expired_holds(now=None, batch_size=1000):
+    """Release every hold that expired by `now`, one committed batch at a
+    time; walks ix_cart_hold_expires_at rather than the whole cart table."""
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        released = release_holds(Cart.hold_expires_at <= now, limit=batch_size)
+        db.session.commit()
+        total += released
+        if released < batch_size:
+            return total
@@ -0,0 +1,185 @@
+# app/jobs.py
+import json
+import multiprocessing
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, g
+
+from .extensions import db
+from .models import Job
+
+# kind -> handler(payload); registered with @job('kind')
+HANDLERS = {}
+JOB_TIMEOUT = 300   # seconds before a running job is considered abandoned
+
+
+def job(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+# ------------------ Enqueue ------------------
+def enqueue(kind, payload=None, key=None, max_attempts=5, run_at=None):
+    """Queue a job inside the caller's transaction.
+
+    The job only becomes visible once the caller commits, so it can never
+    run for a write that was rolled back. A repeated `key` is ignored.
+    `run_at` (UTC) delays the job; it runs as soon as possible by default.
+    """
+    enqueue_many(kind, [(payload, key)], max_attempts=max_attempts, run_at=run_at)
+
+
+def enqueue_many(kind, jobs, max_attempts=5, run_at=None):
+    """Like enqueue, for a list of (payload, key) pairs in one INSERT."""
+    if not jobs:
+        return
+    run_at = run_at or datetime.utcnow()
+    rows = [{
+        'kind': kind,
+        'payload': json.dumps(payload or {}, default=str),
+        'idempotency_key': key,
+        'max_attempts': max_attempts,
+        'status': 'pending',
+        'attempts': 0,
+        'run_at': run_at,
+    } for payload, key in jobs]
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.session.execute(insert(Job).on_conflict_do_nothing(index_elements=['idempotency_key']), rows)
+    else:
+        for values in rows:
+            key = values['idempotency_key']
+            if key is None or not Job.query.filter_by(idempotency_key=key).first():
+                db.session.execute(db.insert(Job).values(**values))
+
+    if current_app.config.get('JOBS_INLINE'):
+        g.run_jobs_after_request = True
+
+
+# ------------------ Worker ------------------
+def claim_next():
+    """Atomically claim one due job; None if the queue is idle.
+
+    A claimed job's run_at is pushed JOB_TIMEOUT into the future, so a job
+    whose worker died while running it becomes due again (visibility timeout).
+    """
+    now = datetime.utcnow()
+    due = (Job.status.in_(('pending', 'running')), Job.run_at <= now)
+    while True:
+        candidate = db.session.scalar(
+            db.select(Job.id).where(*due).order_by(Job.run_at, Job.id).limit(1)
+        )
+        if candidate is None:
+            return None
+        claimed = db.session.execute(
+            db.update(Job)
+            .where(Job.id == candidate, *due)
+            .values(status='running', attempts=Job.attempts + 1,
+                    run_at=now + timedelta(seconds=JOB_TIMEOUT))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, candidate)
+        # Another worker won the race; try the next one
+
+
+def run_job(job_row):
+    handler = HANDLERS.get(job_row.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind {job_row.kind!r}")
+        handler(json.loads(job_row.payload))
+        # The handler's writes and the completion commit together
+        job_row.status = 'done'
+        job_row.last_error = None
+        db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        job_row = db.session.get(Job, job_row.id)
+        job_row.last_error = traceback.format_exc(limit=5)
+        if job_row.attempts >= job_row.max_attempts:
+            job_row.status = 'failed'
+        else:
+            job_row.status = 'pending'
+            job_row.run_at = datetime.utcnow() + timedelta(seconds=2 ** job_row.attempts)
+        db.session.commit()
+        current_app.logger.exception("Job %s (%s) failed", job_row.id, job_row.kind)
+        return False
+
+
+def work(max_jobs=None):
+    """Run due jobs until the queue is empty (or max_jobs ran)."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job_row = claim_next()
+        if job_row is None:
+            break
+        run_job(job_row)
+        done += 1
+    return done
+
+
+def _worker_process(poll_interval):
+    from . import create_app
+    app = create_app()
+    with app.app_context():
+        while True:
+            if not work():
+                time.sleep(poll_interval)
+
+
+@click.command('jobs-worker')
+@click.option('--processes', default=2, show_default=True, help="Worker processes to start.")
+@click.option('--poll-interval', default=1.0, show_default=True, help="Seconds to sleep when idle.")
+@click.option('--once', is_flag=True, help="Drain the queue in this process and exit.")
+def worker_command(processes, poll_interval, once):
+    """Process background jobs."""
+    if once:
+        click.echo(f"Processed {work()} jobs.")
+        return
+    workers = [multiprocessing.Process(target=_worker_process, args=(poll_interval,), daemon=True)
+               for _ in range(processes)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+
+def next_run_at():
+    """When the earliest queued job is due; None if the queue is empty."""
+    return db.session.scalar(
+        db.select(db.func.min(Job.run_at)).where(Job.status.in_(('pending', 'running'))))
+
+
+def init_app(app):
+    # Inline mode runs queued jobs once the response has been sent, so a
+    # development server works without a separate worker. Delayed jobs
+    # (hold sweeps, retries) run after the first request once they are due;
+    # the first request after start-up catches up on anything overdue.
+    app.config.setdefault('JOBS_INLINE', False)
+    app.cli.add_command(worker_command)
+    state = app.extensions['jobs'] = {'next_run_at': datetime.min}
+
+    @app.after_request
+    def run_inline_jobs(response):
+        enqueued = g.pop('run_jobs_after_request', False)
+        if enqueued or (app.config['JOBS_INLINE'] and state['next_run_at'] <= datetime.utcnow()):
+            # One drain at a time; retried after JOB_TIMEOUT should this one die
+            state['next_run_at'] = datetime.utcnow() + timedelta(seconds=JOB_TIMEOUT)
+            def drain():
+                with app.app_context():
+                    work()
+                    state['next_run_at'] = next_run_at() or datetime.max
+            response.call_on_close(drain)
+        return response
@@ -1,4 +1,5 @@
 from flask_login import UserMixin
+from sqlalchemy.ext.hybrid import hybrid_property
 from .extensions import db
 from datetime import datetime
 
@@ -8,9 +9,18 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(10), nullable=False)  # 'user', 'merchant', 'admin'
     approved = db.Column(db.Boolean, default=False)
+    deleted_at = db.Column(db.DateTime)     # set while accounts.delete_user purges the account
+
+    # ✅ Admin listing filters by role and approval, paged by id. Ids are
+    # never reused (AUTOINCREMENT) because job keys are built from them.
+    __table_args__ = (
+        db.Index('ix_user_role_approved', 'role', 'approved', 'id'),
+        {'sqlite_autoincrement': True},
+    )
 
     # ✅ Relationships
-    orders = db.relationship('Order', backref='user', cascade="all, delete", passive_deletes=True)
+    orders = db.relationship('Order', backref='user', cascade="all, delete", passive_deletes=True,
+                             foreign_keys='Order.user_id')
     carts = db.relationship('Cart', backref='user', cascade="all, delete", passive_deletes=True)
     products = db.relationship('Product', backref='merchant', cascade="all, delete", passive_deletes=True)
 
@@ -19,6 +29,9 @@ class Product(db.Model):
     name = db.Column(db.String(100), nullable=False)
     price = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False)
+    reserved = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # held by carts
+    sku = db.Column(db.String(64))                      # merchant's own SKU (bulk import key)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # optimistic lock
     merchant_id = db.Column(
         db.Integer,
         db.ForeignKey('user.id', ondelete='CASCADE', name='fk_product_merchant_id'),
@@ -28,6 +41,19 @@ class Product(db.Model):
     orders = db.relationship('Order', backref='product', cascade="all, delete", passive_deletes=True)
     carts = db.relationship('Cart', backref='product', cascade="all, delete", passive_deletes=True)
 
+    # ✅ Composite indexes backing the storefront keyset pagination
+    __table_args__ = (
+        db.Index('ix_product_price_id', 'price', 'id'),
+        db.Index('ix_product_name_id', 'name', 'id'),
+        db.Index('ix_product_stock', 'stock'),
+        db.UniqueConstraint('merchant_id', 'sku', name='uq_product_merchant_sku'),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
+    @hybrid_property
+    def available(self):
+        return self.stock - self.reserved
+
 class Cart(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
@@ -41,6 +67,15 @@ class Cart(db.Model):
         nullable=False
     )
     quantity = db.Column(db.Integer, nullable=False)
+    held = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # units reserved on the product
+    hold_expires_at = db.Column(db.DateTime)                                       # NULL once released
+
+    # ✅ Lets the hold sweeper find expired holds without a table scan
+    __table_args__ = (
+        db.Index('ix_cart_hold_expires_at', 'hold_expires_at'),
+        db.Index('ix_cart_user_product', 'user_id', 'product_id'),
+        db.Index('ix_cart_product_id', 'product_id'),      # ON DELETE CASCADE lookups
+    )
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -56,3 +91,112 @@ class Order(db.Model):
     )
     quantity = db.Column(db.Integer, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # ✅ Snapshot of the product at purchase time (see orders.snapshot)
+    unit_price = db.Column(db.Float)
+    product_name = db.Column(db.String(100))
+    merchant_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE', name='fk_order_merchant_id')
+    )
+
+    __table_args__ = (
+        db.Index('ix_order_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_order_merchant_timestamp', 'merchant_id', 'timestamp'),
+        db.Index('ix_order_product_id', 'product_id'),     # ON DELETE CASCADE lookups
+        {'sqlite_autoincrement': True},     # ids feed job keys, so never reuse them
+    )
+
+class SalesRollup(db.Model):
+    # ✅ Incrementally maintained per-day, per-product sales totals
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(
+        db.Integer,
+        db.ForeignKey('product.id', ondelete='CASCADE', name='fk_sales_rollup_product_id'),
+        primary_key=True
+    )
+    merchant_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE', name='fk_sales_rollup_merchant_id'),
+        nullable=False
+    )
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_sales_rollup_product_id', 'product_id'),   # ON DELETE CASCADE lookups
+    )
+
+class ProductSalesTotal(db.Model):
+    # ✅ Lifetime totals per product, maintained alongside SalesRollup
+    product_id = db.Column(
+        db.Integer,
+        db.ForeignKey('product.id', ondelete='CASCADE', name='fk_product_sales_total_product_id'),
+        primary_key=True
+    )
+    merchant_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE', name='fk_product_sales_total_merchant_id'),
+        nullable=False
+    )
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_product_sales_total_merchant_id', 'merchant_id'),
+    )
+
+class MerchantSalesTotal(db.Model):
+    # ✅ Lifetime totals per merchant: one row, one primary-key lookup
+    merchant_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE', name='fk_merchant_sales_total_merchant_id'),
+        primary_key=True
+    )
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+class CatalogVersion(db.Model):
+    # ✅ Single row bumped with every product write (see cache.CatalogCache),
+    # so every process agrees on the catalog version behind the ETags
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    stock_generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # stock-only writes too
+    modified = db.Column(db.Integer, nullable=False)       # unix time of the last write
+
+class Job(db.Model):
+    # ✅ Background job queue (see jobs.py); the row commits with the request's write
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')     # JSON
+    idempotency_key = db.Column(db.String(100), unique=True)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+class Notification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey('user.id', ondelete='CASCADE', name='fk_notification_user_id'),
+        nullable=False
+    )
+    product_id = db.Column(
+        db.Integer,
+        db.ForeignKey('product.id', ondelete='CASCADE', name='fk_notification_product_id')
+    )
+    message = db.Column(db.String(200), nullable=False)
+    read = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_notification_user_read', 'user_id', 'read'),
+        db.Index('ix_notification_product_id', 'product_id'),  # ON DELETE CASCADE lookups
+    )
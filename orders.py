@@ -0,0 +1,61 @@
+# app/orders.py
+import click
+
+from .extensions import db
+from .models import Order, Product
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def snapshot(product):
+    """Order columns copied from the product when it is bought."""
+    return {
+        'unit_price': product.price,
+        'product_name': product.name,
+        'merchant_id': product.merchant_id,
+    }
+
+
+def order_history(user_id):
+    """A user's orders, newest first, served from the snapshot columns
+    via ix_order_user_timestamp."""
+    return db.select(Order).where(Order.user_id == user_id).order_by(Order.timestamp.desc())
+
+
+def backfill_snapshots(batch_size=BACKFILL_BATCH_SIZE, connection=None):
+    """Fill the snapshot columns of orders placed before they existed.
+
+    Walks the table in primary-key ranges and commits after each range so
+    the write lock is only ever held briefly. Given a `connection` (the
+    migration's), runs the same ranges on it and leaves committing to it.
+    """
+    orders, products = Order.__table__, Product.__table__
+    executor = connection if connection is not None else db.session
+
+    def product_column(column):
+        return db.select(column).where(products.c.id == orders.c.product_id).scalar_subquery()
+
+    last_id = executor.execute(db.select(db.func.max(orders.c.id))).scalar() or 0
+    updated = 0
+    for start in range(0, last_id, batch_size):
+        updated += executor.execute(
+            db.update(orders)
+            .where(orders.c.id > start, orders.c.id <= start + batch_size, orders.c.unit_price.is_(None))
+            .values(unit_price=product_column(products.c.price),
+                    product_name=product_column(products.c.name),
+                    merchant_id=product_column(products.c.merchant_id))
+        ).rowcount
+        if connection is None:
+            db.session.commit()
+    return updated
+
+
+@click.command('orders-backfill')
+@click.option('--batch-size', default=BACKFILL_BATCH_SIZE, show_default=True)
+def backfill_command(batch_size):
+    """Copy price, name and merchant onto orders that predate the snapshot columns."""
+    click.echo(f"Backfilled {backfill_snapshots(batch_size)} orders.")
+
+
+def init_app(app):
+    app.cli.add_command(backfill_command)
@@ -0,0 +1,212 @@
+# app/product_import.py
+import csv
+import io
+import json
+import math
+
+import click
+
+from . import search
+from .cache import catalog_cache
+from .extensions import db
+from .models import Product, User
+
+IMPORT_FIELDS = ('sku', 'name', 'price', 'stock')
+BATCH_SIZE = 1000       # rows per executemany
+COMMIT_EVERY = 10       # batches per commit
+MAX_REPORTED_ERRORS = 100
+MAX_STOCK = 2 ** 31 - 1
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []            # (line number, message), capped
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+# ------------------ Parsing (streamed, one row at a time) ------------------
+def iter_rows(stream, fmt):
+    """Yield (line number, dict) from a binary file-like object.
+
+    Unparseable rows come through as None. Bytes that aren't UTF-8 are kept
+    as lone surrogates, so validate() can reject just the rows holding them.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='surrogateescape', newline='')
+    if fmt == 'ndjson':
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_no, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(text)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error:       # e.g. a field over csv.field_size_limit()
+                row = None
+            yield reader.line_num, row
+
+
+def _encodable(value):
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def validate(row):
+    if row is None:
+        raise ValueError("unreadable row")
+    if not all(_encodable(str(value)) for value in row.values() if value is not None):
+        raise ValueError("row is not valid UTF-8")
+    sku = str(row.get('sku') or '').strip()
+    name = str(row.get('name') or '').strip()
+    if not sku or len(sku) > 64:
+        raise ValueError("sku is required (max 64 characters)")
+    if not name or len(name) > 100:
+        raise ValueError("name is required (max 100 characters)")
+    try:
+        price = float(row.get('price'))
+        stock = int(row.get('stock'))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("price must be a number and stock an integer")
+    if not math.isfinite(price):
+        raise ValueError("price must be a finite number")
+    if price < 0 or stock < 0:
+        raise ValueError("price and stock must not be negative")
+    if stock > MAX_STOCK:
+        raise ValueError(f"stock must be at most {MAX_STOCK}")
+    return {'sku': sku, 'name': name, 'price': price, 'stock': stock}
+
+
+# ------------------ Writing ------------------
+def _held_above_stock(merchant_id, rows):
+    """{sku: reserved} for rows whose stock is below what carts hold."""
+    wanted = {row['sku']: row['stock'] for row in rows}
+    held = db.session.execute(
+        db.select(Product.sku, Product.reserved)
+        .where(Product.merchant_id == merchant_id, Product.sku.in_(list(wanted)), Product.reserved > 0)
+    ).all()
+    return {sku: reserved for sku, reserved in held if wanted[sku] < reserved}
+
+
+def _upsert_batch(merchant_id, rows):
+    for row in rows:
+        row['merchant_id'] = merchant_id
+
+    # Rows below their reservations are rejected up front; this only
+    # covers holds placed since then, so stock never drops under reserved
+    table = Product.__table__
+
+    def at_least_reserved(stock):
+        return db.case((stock < table.c.reserved, table.c.reserved), else_=stock)
+
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['merchant_id', 'sku'],
+            set_={
+                'name': stmt.excluded.name,
+                'price': stmt.excluded.price,
+                'stock': at_least_reserved(stmt.excluded.stock),
+                'version': table.c.version + 1,
+            }
+        )
+        db.session.execute(stmt, rows)
+    else:
+        for row in rows:
+            updated = db.session.execute(
+                db.update(table)
+                .where(table.c.merchant_id == merchant_id, table.c.sku == row['sku'])
+                .values(name=row['name'], price=row['price'], stock=at_least_reserved(row['stock']),
+                        version=table.c.version + 1)
+            ).rowcount
+            if not updated:
+                db.session.execute(db.insert(table), [row])
+
+    search.index_products_where(Product.merchant_id == merchant_id,
+                                Product.sku.in_([row['sku'] for row in rows]))
+
+
+def import_products(merchant_id, stream, fmt='csv'):
+    """Upsert products by (merchant, sku); bad rows are reported, not fatal."""
+    report = ImportReport()
+    batch = {}                      # sku -> row, so a repeated SKU keeps its last version
+    lines = {}                      # sku -> line number of that row
+    batches = 0
+
+    def flush():
+        nonlocal batches
+        if not batch:
+            return
+        for sku, reserved in _held_above_stock(merchant_id, batch.values()).items():
+            report.error(lines[sku], f"stock can't go below the {reserved} units held in carts")
+            del batch[sku]
+        if not batch:
+            return
+        _upsert_batch(merchant_id, list(batch.values()))
+        report.imported += len(batch)
+        batch.clear()
+        lines.clear()
+        batches += 1
+        if batches % COMMIT_EVERY == 0:
+            db.session.commit()
+
+    for line_no, row in iter_rows(stream, fmt):
+        try:
+            clean = validate(row)
+        except ValueError as exc:
+            report.error(line_no, str(exc))
+            continue
+        batch[clean['sku']] = clean
+        lines[clean['sku']] = line_no
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+    catalog_cache.invalidate()
+    db.session.commit()
+    return report
+
+
+def detect_format(filename, requested=None):
+    if requested in ('csv', 'ndjson'):
+        return requested
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+@click.command('products-import')
+@click.argument('merchant')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None)
+def import_command(merchant, path, fmt):
+    """Bulk upsert products for MERCHANT (username) from a CSV/NDJSON file."""
+    user = User.query.filter_by(username=merchant, role='merchant').first()
+    if user is None:
+        raise click.ClickException(f"No merchant named {merchant!r}.")
+    with open(path, 'rb') as stream:
+        report = import_products(user.id, stream, detect_format(path, fmt))
+    click.echo(f"Imported {report.imported} rows, {report.failed} failed.")
+    for line, message in report.errors:
+        click.echo(f"  line {line}: {message}")
+
+
+def init_app(app):
+    app.cli.add_command(import_command)
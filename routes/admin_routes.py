@@ -1,8 +1,20 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash
-from app.models import User, Product, Order,Cart
-from app.extensions import db
+from app.models import User, Product, Order
+from app.extensions import db, SQLInstrumentation
+from app.catalog import cached_all_products, catalog_response, stock_stamp
+from app.cache import catalog_cache
+from app.accounts import (start_deletion, start_deletions, deletion_progress, approve_users,
+                          matching_ids, user_filters, STATUSES)
+from app.fragments import fragment_cache
+from app.identity import identity_cache
+from app.auth import auth_service, RateLimited
+from app import analytics
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -12,9 +24,13 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = User.query.filter_by(username=username, role='admin').first()
+        try:
+            user = auth_service.authenticate(username, password, role='admin')
+        except RateLimited:
+            flash("Too many login attempts. Please wait a minute and try again.", "danger")
+            return render_template('admin/login.html'), 429
 
-        if user and check_password_hash(user.password, password):
+        if user:
             login_user(user)
             return redirect(url_for('admin.dashboard'))
         else:
@@ -22,14 +38,23 @@ def login():
 
     return render_template('admin/login.html')
 
-# Admin Dashboard (menu only)
+# Admin Dashboard (menu + analytics from the sales rollups)
 @admin_bp.route('/dashboard')
 @login_required
 def dashboard():
     if current_user.role != 'admin':
         flash("Access denied", "danger")
         return redirect(url_for('admin.login'))
-    return render_template('admin/dashboard.html')
+
+    return render_template(
+        'admin/dashboard.html',
+        revenue_by_day=analytics.revenue_by_day(),
+        top_products=analytics.top_products(),
+        top_merchants=analytics.top_merchants(),
+        low_stock=analytics.low_stock(),
+        account_counts=analytics.account_counts(),
+        low_stock_threshold=analytics.LOW_STOCK_THRESHOLD
+    )
 
 # View Users & Merchants
 @admin_bp.route('/users')
@@ -39,9 +64,62 @@ def view_users():
         flash("Access denied", "danger")
         return redirect(url_for('admin.login'))
 
-    users = User.query.filter_by(role='user').all()
-    merchants = User.query.filter_by(role='merchant').all()
-    return render_template('admin/users.html', users=users, merchants=merchants)
+    filters = {
+        'role': request.args.get('role', 'all'),
+        'status': request.args.get('status', 'all'),
+        'q': request.args.get('q', '').strip(),
+    }
+    conditions = user_filters(filters['role'], filters['status'], filters['q'])
+    per_page = current_app.config['ADMIN_USERS_PER_PAGE']
+
+    # Keyset pagination on id; ?after=<last id on the previous page>
+    query = User.query.filter(*conditions).order_by(User.id)
+    after = request.args.get('after', type=int)
+    if after:
+        query = query.filter(User.id > after)
+    rows = query.limit(per_page + 1).all()
+    users = rows[:per_page]
+    next_after = users[-1].id if len(rows) > per_page else None
+
+    total = db.session.scalar(db.select(db.func.count()).select_from(User).where(*conditions))
+    return render_template('admin/users.html', users=users, filters=filters, total=total,
+                           statuses=STATUSES, next_after=next_after, after=after,
+                           deletions=deletion_progress())
+
+# Bulk approve / delete
+@admin_bp.route('/users/bulk', methods=['POST'])
+@login_required
+def bulk_users():
+    if current_user.role != 'admin':
+        flash("Access denied", "danger")
+        return redirect(url_for('admin.login'))
+
+    action = request.form.get('action')
+    filters = {key: request.form.get(key, '') for key in ('role', 'status', 'q')}
+    if action not in ('approve', 'delete'):
+        flash("Choose approve or delete.", "warning")
+        return redirect(url_for('admin.view_users', **filters))
+
+    batch_size = current_app.config['BULK_BATCH_SIZE']
+    if request.form.get('scope') == 'matching':
+        batches = matching_ids(user_filters(filters['role'], filters['status'], filters['q']), batch_size)
+    else:
+        selected = request.form.getlist('user_ids', type=int)
+        batches = (selected[i:i + batch_size] for i in range(0, len(selected), batch_size))
+
+    # One set-based statement and one commit per batch
+    changed = 0
+    for ids in batches:
+        if action == 'approve':
+            changed += approve_users(ids)
+        else:
+            changed += len(start_deletions(ids))
+        db.session.commit()
+        identity_cache.invalidate(*ids)
+
+    verb = "approved" if action == 'approve' else "queued for deletion"
+    flash(f"{changed} account(s) {verb}.", "success" if action == 'approve' else "warning")
+    return redirect(url_for('admin.view_users', **filters))
 
 # View All Products
 @admin_bp.route('/products')
@@ -51,8 +129,9 @@ def view_products():
         flash("Access denied", "danger")
         return redirect(url_for('admin.login'))
 
-    products = Product.query.all()
-    return render_template('admin/products.html', products=products)
+    products = cached_all_products()
+    return catalog_response(lambda: render_template('admin/products.html', products=products),
+                            stock_stamp(products))
 
 # View All Orders
 @admin_bp.route('/orders')
@@ -65,6 +144,108 @@ def view_orders():
     orders = Order.query.all()
     return render_template('admin/orders.html', orders=orders)
 
+# ------------------ Streaming exports ------------------
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_response(statement, columns, filename):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        fmt = 'csv'
+
+    def generate():
+        # yield_per keeps a bounded window of rows in memory at any time
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for batch in result.partitions():
+                writer.writerows(batch)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for batch in result.partitions():
+                yield ''.join(
+                    json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in batch
+                )
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+
+# Export Orders (filters: start, end as YYYY-MM-DD; merchant_id)
+@admin_bp.route('/orders/export')
+@login_required
+def export_orders():
+    if current_user.role != 'admin':
+        flash("Access denied", "danger")
+        return redirect(url_for('admin.login'))
+
+    statement = (
+        db.select(Order.id, Order.user_id, Order.product_id, Order.merchant_id,
+                  Order.product_name, Order.unit_price, Order.quantity, Order.timestamp)
+        .order_by(Order.id)
+    )
+    start = _parse_date(request.args.get('start'))
+    end = _parse_date(request.args.get('end'))
+    merchant_id = request.args.get('merchant_id', type=int)
+    if start:
+        statement = statement.where(Order.timestamp >= start)
+    if end:
+        statement = statement.where(Order.timestamp < end + timedelta(days=1))
+    if merchant_id:
+        statement = statement.where(Order.merchant_id == merchant_id)
+
+    columns = ['id', 'user_id', 'product_id', 'merchant_id', 'product_name', 'unit_price',
+               'quantity', 'timestamp']
+    return _export_response(statement, columns, 'orders')
+
+
+# Export Products (filter: merchant_id)
+@admin_bp.route('/products/export')
+@login_required
+def export_products():
+    if current_user.role != 'admin':
+        flash("Access denied", "danger")
+        return redirect(url_for('admin.login'))
+
+    statement = db.select(Product.id, Product.name, Product.price, Product.stock,
+                          Product.merchant_id).order_by(Product.id)
+    merchant_id = request.args.get('merchant_id', type=int)
+    if merchant_id:
+        statement = statement.where(Product.merchant_id == merchant_id)
+
+    columns = ['id', 'name', 'price', 'stock', 'merchant_id']
+    return _export_response(statement, columns, 'products')
+
+# Per-endpoint SQL statistics (requires SQL_INSTRUMENTATION)
+@admin_bp.route('/sql-stats')
+@login_required
+def sql_stats():
+    if current_user.role != 'admin':
+        flash("Access denied", "danger")
+        return redirect(url_for('admin.login'))
+
+    stats = SQLInstrumentation.snapshot(current_app)
+    return render_template('admin/sql_stats.html', stats=stats,
+                           slow_query_ms=current_app.config['SLOW_QUERY_MS'],
+                           cache_stats=catalog_cache.stats(),
+                           fragment_stats=fragment_cache.stats())
+
 # Approve User or Merchant
 @admin_bp.route('/approve/<int:user_id>')
 @login_required
@@ -77,6 +258,7 @@ def approve_user(user_id):
     if user:
         user.approved = True
         db.session.commit()
+        identity_cache.invalidate(user.id)
         flash(f"{user.username} approved successfully.", "success")
     return redirect(url_for('admin.view_users'))
 
@@ -90,16 +272,14 @@ def delete_user(user_id):
         return redirect(url_for('admin.login'))
 
     user = User.query.get(user_id)
-    if user:
-        # First, delete all related orders
-        Order.query.filter_by(user_id=user.id).delete()
-
-        # Optionally, delete related cart items too
-        Cart.query.filter_by(user_id=user.id).delete()
-
-        db.session.delete(user)
+    if user and user.deleted_at is None:
+        # Locks the account now; orders, products etc. go in background chunks
+        if not start_deletion(user):
+            flash(f"{user.username} is an admin account and can't be deleted here.", "danger")
+            return redirect(url_for('admin.view_users'))
         db.session.commit()
-        flash(f"{user.username} and related data deleted.", "warning")
+        identity_cache.invalidate(user_id)
+        flash(f"{user.username} is being deleted; progress is shown below.", "warning")
     return redirect(url_for('admin.view_users'))
 
 
@@ -0,0 +1,230 @@
+# app/routes/api_routes.py
+# Versioned JSON API over the same models as the HTML blueprints. Session
+# login is shared with user_bp (POST /login), so API clients keep the cookie.
+import gzip
+import json
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, current_app, request
+from flask_login import current_user
+from app.models import db, Product, Cart, Order
+from app.carts import add_items, remove_items
+from app.catalog import (cached_product_page, decode_cursor, pack_cursor,
+                         SORT_OPTIONS, DEFAULT_SORT, MIN_ID, MAX_ID)
+
+try:
+    import orjson
+except ImportError:     # optional: compact stdlib JSON is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:     # optional: gzip only
+    brotli = None
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+PRODUCT_FIELDS = ('id', 'name', 'price', 'stock', 'available', 'merchant_id')
+ORDER_FIELDS = ('id', 'product_id', 'product_name', 'unit_price', 'quantity', 'timestamp')
+MAX_BATCH = 100         # ids per /products?ids= lookup and items per cart call
+MAX_PAGE = 100
+COMPRESS_MIN_BYTES = 512
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), default=str).encode()
+
+
+def respond(data, status=200):
+    return current_app.response_class(dumps(data), status=status, mimetype='application/json')
+
+
+def error(message, status):
+    return respond({'error': message}, status)
+
+
+def selected_fields(allowed):
+    # ?fields=id,name narrows every object in the response
+    wanted = request.args.get('fields')
+    if not wanted:
+        return allowed
+    fields = tuple(f for f in wanted.split(',') if f in allowed)
+    return fields or allowed
+
+
+def pick(row, fields):
+    return {field: row[field] for field in fields}
+
+
+def int_list(raw):
+    try:
+        values = [int(value) for value in raw.split(',') if value]
+    except ValueError:
+        return None
+    # Anything outside SQLite's integer range can't even be bound
+    return values if all(MIN_ID <= value <= MAX_ID for value in values) else None
+
+
+def user_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return error("Login required", 401)
+        if current_user.role != 'user':
+            return error("Only users have carts and orders", 403)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@api_bp.after_request
+def compress(response):
+    if (response.direct_passthrough or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+# ------------------ Products ------------------
+@api_bp.route('/products')
+def products():
+    fields = selected_fields(PRODUCT_FIELDS)
+
+    # Batch lookup: one IN query, results in the order the ids were given
+    if 'ids' in request.args:
+        ids = int_list(request.args['ids'])
+        if ids is None:
+            return error("ids must be a comma-separated list of integers", 400)
+        if len(ids) > MAX_BATCH:
+            return error(f"At most {MAX_BATCH} ids per request", 400)
+        columns = [getattr(Product, field).label(field) for field in fields if field != 'id']
+        rows = {row.id: row._asdict() for row in db.session.execute(
+            db.select(Product.id, *columns).where(Product.id.in_(ids)))}
+        return respond({
+            'items': [pick(rows[i], fields) for i in ids if i in rows],
+            'missing': [i for i in ids if i not in rows],
+        })
+
+    sort = request.args.get('sort', DEFAULT_SORT)
+    if sort not in SORT_OPTIONS:
+        return error(f"sort must be one of {', '.join(SORT_OPTIONS)}", 400)
+    per_page = min(request.args.get('limit', current_app.config['PRODUCTS_PER_PAGE'], type=int), MAX_PAGE)
+    rows, next_cursor = cached_product_page(sort=sort, cursor=request.args.get('cursor'),
+                                            per_page=max(per_page, 1))
+    return respond({'items': [pick(row, fields) for row in rows], 'next_cursor': next_cursor})
+
+# ------------------ Cart ------------------
+def cart_payload():
+    rows = db.session.execute(
+        db.select(Cart.product_id, Cart.quantity, Cart.held, Cart.hold_expires_at,
+                  Product.name, Product.price)
+        .join(Product, Product.id == Cart.product_id)
+        .where(Cart.user_id == current_user.id)
+        .order_by(Cart.id)
+    ).all()
+    items = [{'product_id': r.product_id, 'name': r.name, 'price': r.price,
+              'quantity': r.quantity, 'subtotal': r.price * r.quantity, 'held': r.held,
+              'hold_expires_at': r.hold_expires_at.isoformat() if r.hold_expires_at else None}
+             for r in rows]
+    return {'items': items, 'total': sum(item['subtotal'] for item in items)}
+
+
+@api_bp.route('/cart')
+@user_required
+def view_cart():
+    return respond(cart_payload())
+
+
+@api_bp.route('/cart/items', methods=['POST'])
+@user_required
+def add_to_cart():
+    # {"items": [{"product_id": 1, "quantity": 2}, ...]}; all or nothing
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('items', []), list):
+        return error('Send a JSON object like {"items": [...]}', 400)
+    quantities = {}
+    try:
+        for item in payload.get('items', []):
+            if not isinstance(item, dict):
+                raise TypeError
+            product_id, quantity = int(item['product_id']), int(item.get('quantity', 1))
+            if quantity < 1 or not MIN_ID <= product_id <= MAX_ID or quantity > MAX_ID:
+                raise ValueError
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+    except (KeyError, TypeError, ValueError):
+        return error("items must be objects with product_id and a positive quantity", 400)
+    if not quantities or len(quantities) > MAX_BATCH:
+        return error(f"Send between 1 and {MAX_BATCH} items", 400)
+
+    problems = add_items(current_user.id, quantities)
+    if problems:
+        db.session.rollback()
+        return respond({'error': "Not enough stock or product not found.", 'product_ids': problems}, 409)
+    db.session.commit()
+    return respond(cart_payload())
+
+
+@api_bp.route('/cart/items', methods=['DELETE'])
+@user_required
+def remove_from_cart():
+    # {"product_ids": [1, 2]} removes those lines; omit it to empty the cart
+    # Only a missing body empties the cart; [] or null must not
+    payload = request.get_json(silent=True) if request.get_data() else {}
+    if not isinstance(payload, dict):
+        return error('Send a JSON object like {"product_ids": [...]}', 400)
+    product_ids = None
+    if 'product_ids' in payload:
+        try:
+            if not isinstance(payload['product_ids'], list):
+                raise TypeError
+            product_ids = [int(product_id) for product_id in payload['product_ids']]
+            if not all(MIN_ID <= product_id <= MAX_ID for product_id in product_ids):
+                raise ValueError
+        except (TypeError, ValueError):
+            return error("product_ids must be a list of integers", 400)
+    remove_items(current_user.id, product_ids)
+    db.session.commit()
+    return respond(cart_payload())
+
+# ------------------ Orders ------------------
+@api_bp.route('/orders')
+@user_required
+def orders():
+    # Newest first, keyset-paginated on (timestamp, id) via ix_order_user_timestamp
+    fields = selected_fields(ORDER_FIELDS)
+    limit = max(min(request.args.get('limit', 20, type=int), MAX_PAGE), 1)
+    query = (db.select(Order)
+             .where(Order.user_id == current_user.id)
+             .order_by(Order.timestamp.desc(), Order.id.desc())
+             .limit(limit + 1))
+
+    position = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    if position is not None:
+        try:
+            timestamp = datetime.fromisoformat(position[0])
+        except (TypeError, ValueError):
+            return error("Invalid cursor", 400)
+        query = query.where(db.tuple_(Order.timestamp, Order.id) < (timestamp, position[1]))
+
+    rows = db.session.scalars(query).all()
+    page = rows[:limit]
+    next_cursor = pack_cursor(page[-1].timestamp.isoformat(), page[-1].id) if len(rows) > limit else None
+    items = [pick({
+        'id': order.id, 'product_id': order.product_id, 'product_name': order.product_name,
+        'unit_price': order.unit_price, 'quantity': order.quantity,
+        'timestamp': order.timestamp.isoformat(),
+    }, fields) for order in page]
+    return respond({'items': items, 'next_cursor': next_cursor})
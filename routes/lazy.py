@@ -0,0 +1,66 @@
+# app/routes/lazy.py
+"""Deferred blueprints for serving workers.
+
+Rarely used blueprints (admin) keep their URL rules registered up front, so
+url_for() works in every worker. Their module is only imported when one of
+their views is first called (Flask's "lazy loading views" pattern).
+"""
+from werkzeug.utils import cached_property, import_string
+
+# (rule, view function, methods) -- keep in step with admin_routes.py;
+# register_blueprint() warns in non-serving mode when they drift apart.
+ADMIN_RULES = [
+    ('/login', 'login', ('GET', 'POST')),
+    ('/dashboard', 'dashboard', ('GET',)),
+    ('/users', 'view_users', ('GET',)),
+    ('/users/bulk', 'bulk_users', ('POST',)),
+    ('/products', 'view_products', ('GET',)),
+    ('/orders', 'view_orders', ('GET',)),
+    ('/orders/export', 'export_orders', ('GET',)),
+    ('/products/export', 'export_products', ('GET',)),
+    ('/sql-stats', 'sql_stats', ('GET',)),
+    ('/approve/<int:user_id>', 'approve_user', ('GET',)),
+    ('/delete/<int:user_id>', 'delete_user', ('GET',)),
+    ('/logout', 'logout', ('GET',)),
+]
+
+LAZY_BLUEPRINTS = {
+    # name: (module, blueprint attribute, url prefix, rules)
+    'admin': ('app.routes.admin_routes', 'admin_bp', '/admin', ADMIN_RULES),
+}
+
+
+class LazyView:
+    """Imports ``module.function`` on the first call and delegates to it."""
+
+    def __init__(self, import_name):
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def _rule_set(prefix, rules):
+    return {(prefix + rule, name, frozenset(methods)) for rule, name, methods in rules}
+
+
+def register_blueprint(app, name, lazy=False):
+    """Register a blueprint from LAZY_BLUEPRINTS, deferring its import if `lazy`."""
+    module, attribute, prefix, rules = LAZY_BLUEPRINTS[name]
+    if lazy:
+        for rule, view, methods in rules:
+            app.add_url_rule(prefix + rule, endpoint=f'{name}.{view}',
+                             view_func=LazyView(f'{module}.{view}'), methods=list(methods))
+        return
+
+    blueprint = getattr(import_string(module), attribute)
+    app.register_blueprint(blueprint)
+    registered = {(r.rule, r.endpoint.split('.', 1)[1], frozenset(r.methods - {'HEAD', 'OPTIONS'}))
+                  for r in app.url_map.iter_rules() if r.endpoint.startswith(name + '.')}
+    if registered != _rule_set(prefix, rules):
+        app.logger.warning("LAZY_BLUEPRINTS[%r] is out of date with %s; serving mode "
+                           "would miss routes", name, module)
@@ -1,7 +1,16 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db, User, Product, Order
+from app import search
+from app.cache import catalog_cache
+from app.identity import identity_cache
+from app.models import Notification
+from app import tasks, analytics
+from app.auth import auth_service, RateLimited
+from app.inventory import add_stock
+from app.accounts import start_deletion
+from app.product_import import import_products, detect_format, IMPORT_FIELDS
+from sqlalchemy.orm.exc import StaleDataError
 
 merchant_bp = Blueprint('merchant', __name__, url_prefix='/merchant')
 
@@ -16,7 +25,7 @@ def register():
             flash("Username already exists", "danger")
             return redirect(url_for('merchant.register'))
 
-        hashed_password = generate_password_hash(password)
+        hashed_password = auth_service.hash_password(password)
         new_user = User(
             username=username,
             password=hashed_password,
@@ -36,9 +45,13 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = User.query.filter_by(username=username, role='merchant').first()
+        try:
+            user = auth_service.authenticate(username, password, role='merchant')
+        except RateLimited:
+            flash("Too many login attempts. Please wait a minute and try again.", "danger")
+            return render_template('login.html'), 429           # shared login page
 
-        if user and check_password_hash(user.password, password):
+        if user:
             if user.approved:
                 login_user(user)
                 flash("Login successful", "success")
@@ -59,7 +72,19 @@ def dashboard():
         return redirect(url_for('merchant.login'))
 
     products = Product.query.filter_by(merchant_id=current_user.id).all()
-    return render_template('merchant/merchant_dashboard.html', products=products)
+    notifications = (Notification.query
+                     .filter_by(user_id=current_user.id, read=False)
+                     .order_by(Notification.id.desc())
+                     .limit(10)
+                     .all())
+
+    # Sales figures come from the precomputed totals, never from Order
+    totals = analytics.merchant_totals(current_user.id)
+    totals['sell_through'] = analytics.sell_through(totals['units'], sum(p.stock for p in products))
+    return render_template('merchant/merchant_dashboard.html', products=products,
+                           notifications=notifications, totals=totals,
+                           sales=analytics.product_totals(current_user.id),
+                           sell_through=analytics.sell_through)
 
 # ------------------ Show Add Product Form ------------------
 @merchant_bp.route('/add_product', methods=['GET'])
@@ -88,10 +113,35 @@ def add_product():
         merchant_id=current_user.id
     )
     db.session.add(new_product)
+    db.session.flush()                  # assigns new_product.id for the search index
+    search.index_product(new_product)
+    catalog_cache.invalidate()
     db.session.commit()
     flash("Product added", "success")
     return redirect(url_for('merchant.dashboard'))
 
+# ------------------ Bulk Import Products (CSV / NDJSON) ------------------
+@merchant_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_products_view():
+    if current_user.role != 'merchant':
+        flash("Unauthorized", "danger")
+        return redirect(url_for('merchant.login'))
+
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash("Please choose a file to upload.", "warning")
+            return redirect(url_for('merchant.import_products_view'))
+
+        fmt = detect_format(upload.filename, request.form.get('format'))
+        report = import_products(current_user.id, upload.stream, fmt)
+        flash(f"Imported {report.imported} products, {report.failed} rows failed.",
+              "success" if not report.failed else "warning")
+        return render_template('merchant/merchant_import.html', report=report, fields=IMPORT_FIELDS)
+
+    return render_template('merchant/merchant_import.html', report=None, fields=IMPORT_FIELDS)
+
 # ------------------ Restock Product ------------------
 @merchant_bp.route('/restock/<int:product_id>', methods=['POST'])
 @login_required
@@ -109,7 +159,8 @@ def restock(product_id):
         flash("Unauthorized", "danger")
         return redirect(url_for('merchant.dashboard'))
 
-    product.stock += quantity
+    add_stock(product.id, quantity)
+    tasks.product_restocked(product.id)
     db.session.commit()
     flash("Product restocked", "info")
     return redirect(url_for('merchant.dashboard'))
@@ -125,7 +176,10 @@ def delete_product(product_id):
         flash("Unauthorized", "danger")
         return redirect(url_for('merchant.dashboard'))
 
+    search.remove_product(product.id)
+    analytics.remove_product_sales(product.id)     # its orders go with it
     db.session.delete(product)
+    catalog_cache.invalidate()
     db.session.commit()
     flash("Product deleted", "danger")
     return redirect(url_for('merchant.dashboard'))
@@ -137,14 +191,23 @@ def view_orders():
     if current_user.role != 'merchant':
         return redirect(url_for('merchant.login'))
 
-    orders = Order.query.join(Product).filter(Product.merchant_id == current_user.id).all()
-
-    order_data = [{
-        'product_name': order.product.name,
-        'quantity': order.quantity,
-        'buyer': User.query.get(order.user_id).username,
-        'timestamp': order.timestamp
-    } for order in orders]
+    # Index scans on ix_order_merchant_timestamp; only the buyer name is joined.
+    # Orders from before the snapshot columns (NULL until they are backfilled)
+    # are matched, and named, through their product.
+    own_products = db.select(Product.id).where(Product.merchant_id == current_user.id)
+    product_name = db.select(Product.name).where(Product.id == Order.product_id).scalar_subquery()
+    order_data = db.session.execute(
+        db.select(
+            db.func.coalesce(Order.product_name, product_name).label('product_name'),
+            Order.quantity,
+            User.username.label('buyer'),
+            Order.timestamp
+        )
+        .join(User, Order.user_id == User.id)
+        .where(db.or_(Order.merchant_id == current_user.id,
+                      Order.merchant_id.is_(None) & Order.product_id.in_(own_products)))
+        .order_by(Order.timestamp.desc())
+    ).all()
 
     return render_template('merchant/merchant_orders.html', orders=order_data)
 
@@ -167,7 +230,7 @@ def edit_product_form(product_id):
         flash("Unauthorized", "danger")
         return redirect(url_for('merchant.dashboard'))
 
-    return render_template('merchant/merchant_editProduct.html', product=product)
+    return render_template('merchant/merchant_editproduct.html', product=product)
 
 # ------------------ Handle Product Edit ------------------
 @merchant_bp.route('/update/<int:product_id>', methods=['POST'])
@@ -179,11 +242,30 @@ def update_product(product_id):
         flash("Unauthorized", "danger")
         return redirect(url_for('merchant.dashboard'))
 
+    # The form carries the version it was rendered from; stock is an
+    # absolute value, so saving it over a newer row would undo sales
+    if request.form.get('version', type=int) != product.version:
+        flash("Product changed while you were editing it. Please try again.", "warning")
+        return redirect(url_for('merchant.edit_product_form', product_id=product_id))
+
+    stock = int(request.form['stock'])
+    if stock < product.reserved:
+        flash(f"Stock can't go below the {product.reserved} units held in carts.", "danger")
+        return redirect(url_for('merchant.edit_product_form', product_id=product_id))
+
     product.name = request.form['name']
     product.price = float(request.form['price'])
-    product.stock = int(request.form['stock'])
+    product.stock = stock
 
-    db.session.commit()
+    try:
+        search.index_product(product)   # autoflushes the versioned UPDATE
+        catalog_cache.invalidate()
+        db.session.commit()
+    except StaleDataError:
+        # Stock moved (e.g. a purchase) while the form was being submitted
+        db.session.rollback()
+        flash("Product changed while you were editing it. Please try again.", "warning")
+        return redirect(url_for('merchant.edit_product_form', product_id=product_id))
     flash("Product updated successfully", "success")
     return redirect(url_for('merchant.dashboard'))
 
@@ -199,6 +281,7 @@ def approve_user(user_id):
     if user and user.role in ['user', 'merchant']:
         user.approved = True
         db.session.commit()
+        identity_cache.invalidate(user.id)
         flash(f"{user.username} has been approved.", "success")
     return redirect(url_for('merchant.manage_users'))  # your custom page
 
@@ -212,9 +295,9 @@ def delete_user(user_id):
         return redirect(url_for('merchant.dashboard'))
 
     user = User.query.get(user_id)
-    if user and user.role in ['user', 'merchant']:
-        db.session.delete(user)
+    if user and user.role in ['user', 'merchant'] and user.deleted_at is None and start_deletion(user):
         db.session.commit()
-        flash(f"{user.username} has been deleted.", "warning")
+        identity_cache.invalidate(user_id)
+        flash(f"{user.username} is being deleted.", "warning")
     return redirect(url_for('merchant.manage_users'))
 
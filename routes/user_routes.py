@@ -1,16 +1,59 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db, User, Product, Cart, Order
+from app.catalog import cached_product_page, catalog_response, stock_stamp, SORT_OPTIONS, DEFAULT_SORT
+from app.orders import snapshot, order_history
+from app import tasks
+from app.auth import auth_service, RateLimited
+from app.search import search_products
+from app.inventory import reserve_stock, reserve_stock_bulk
+from app.carts import add_items, remove_items, cart_contents
 from datetime import datetime
 
 user_bp = Blueprint('user', __name__)
 
-# ------------------ Home: View all products ------------------
+# The render_* helpers are shared with the async views in app/asgi.py,
+# which load the same rows through the async engine.
+
+# ------------------ Home: Browse products (keyset paginated) ------------------
+def requested_sort():
+    sort = request.args.get('sort', DEFAULT_SORT)
+    return sort if sort in SORT_OPTIONS else DEFAULT_SORT
+
+
+def render_home(sort, page):
+    products, next_cursor = page
+    return render_template('user_home.html', products=products, sort=sort,
+                           sort_options=SORT_OPTIONS, next_cursor=next_cursor)
+
+
 @user_bp.route('/')
 def home():
-    products = Product.query.all()
-    return render_template('user_home.html', products=products)
+    sort = requested_sort()
+    page = cached_product_page(
+        sort=sort,
+        cursor=request.args.get('after'),
+        per_page=current_app.config['PRODUCTS_PER_PAGE']
+    )
+    return catalog_response(lambda: render_home(sort, page), stock_stamp(page[0]))
+
+# ------------------ Search products ------------------
+@user_bp.route('/search')
+def search():
+    q = request.args.get('q', '').strip()
+    min_price = request.args.get('min_price', type=float)
+    max_price = request.args.get('max_price', type=float)
+    in_stock = request.args.get('in_stock') == '1'
+
+    products = search_products(
+        q,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        limit=current_app.config['SEARCH_RESULTS_LIMIT']
+    ) if q else []
+    return render_template('search.html', products=products, q=q, min_price=min_price,
+                           max_price=max_price, in_stock=in_stock)
 
 # ------------------ Register ------------------
 @user_bp.route('/register', methods=['GET', 'POST'])
@@ -25,7 +68,7 @@ def register():
             flash('Username already taken.', 'danger')
             return redirect(url_for('user.register'))
 
-        hashed_pw = generate_password_hash(password)
+        hashed_pw = auth_service.hash_password(password)
 
         # ❌ No auto-approval for anyone
         approved = False
@@ -47,9 +90,13 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = User.query.filter_by(username=username).first()
+        try:
+            user = auth_service.authenticate(username, password)
+        except RateLimited:
+            flash("Too many login attempts. Please wait a minute and try again.", "danger")
+            return render_template('login.html'), 429
 
-        if user and check_password_hash(user.password, password):
+        if user:
             # ✅ Block login if not approved (except admin)
             if not user.approved and user.role != 'admin':
                 flash("Your account is pending approval by admin.", "warning")
@@ -86,59 +133,101 @@ def logout():
 @login_required
 def add_to_cart(product_id):
     quantity = int(request.form['quantity'])
-    product = Product.query.get(product_id)
-
-    if not product or product.stock < quantity:
+    if quantity < 1 or add_items(current_user.id, {product_id: quantity}):
+        db.session.rollback()
         flash('Not enough stock or product not found.', 'danger')
         return redirect(url_for('user.home'))
 
-    existing = Cart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-    if existing:
-        existing.quantity += quantity
-    else:
-        new_cart_item = Cart(user_id=current_user.id, product_id=product_id, quantity=quantity)
-        db.session.add(new_cart_item)
-
     db.session.commit()
     flash('Item added to cart.', 'success')
     return redirect(url_for('user.view_cart'))
 
 # ------------------ View Cart ------------------
-@user_bp.route('/cart')
-@login_required
-def view_cart():
-    items = Cart.query.filter_by(user_id=current_user.id).all()
+def render_cart(items):
     cart_data = []
     total = 0
 
     for item in items:
-        product = Product.query.get(item.product_id)
+        product = item.product
         if product:
             subtotal = product.price * item.quantity
-            cart_data.append({'product': product, 'quantity': item.quantity, 'subtotal': subtotal})
+            cart_data.append({'product': product, 'quantity': item.quantity, 'subtotal': subtotal,
+                              'held': item.held, 'hold_expires_at': item.hold_expires_at})
             total += subtotal
 
     return render_template('cart.html', cart=cart_data, total=total)
 
+
+@user_bp.route('/cart')
+@login_required
+def view_cart():
+    # One joined query instead of a Product lookup per cart line
+    return render_cart(db.session.scalars(cart_contents(current_user.id)).all())
+
 # ------------------ Remove from Cart ------------------
 @user_bp.route('/remove_from_cart/<int:product_id>')
 @login_required
 def remove_from_cart(product_id):
-    item = Cart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-    if item:
-        db.session.delete(item)
-        db.session.commit()
+    remove_items(current_user.id, [product_id])
+    db.session.commit()
     flash('Item removed from cart.', 'info')
     return redirect(url_for('user.view_cart'))
 
 
 
+# ------------------ Checkout whole cart ------------------
+@user_bp.route('/checkout', methods=['POST'])
+@login_required
+def checkout():
+    if current_user.role != 'user':
+        flash("Only approved users can place orders.", "danger")
+        return redirect(url_for('user.login'))
+
+    # Locked so the hold sweeper cannot release these holds mid-checkout
+    items = Cart.query.filter_by(user_id=current_user.id).with_for_update().all()
+    if not items:
+        flash("Your cart is empty.", "info")
+        return redirect(url_for('user.view_cart'))
+
+    quantities, held = {}, {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        held[item.product_id] = held.get(item.product_id, 0) + item.held
+
+    # One transaction: bulk stock reservation (consuming our holds), bulk
+    # order insert, clear cart
+    if not reserve_stock_bulk(quantities, held):
+        db.session.rollback()
+        flash("Some items in your cart no longer have enough stock.", "danger")
+        return redirect(url_for('user.view_cart'))
+
+    now = datetime.utcnow()
+    products = db.session.execute(
+        db.select(Product.id, Product.name, Product.merchant_id, Product.price)
+        .where(Product.id.in_(list(quantities)))
+    ).all()
+    db.session.execute(db.insert(Order), [
+        dict(snapshot(product), user_id=current_user.id, product_id=product.id,
+             quantity=quantities[product.id], timestamp=now)
+        for product in products
+    ])
+    tasks.orders_placed([(product, quantities[product.id]) for product in products], when=now,
+                        key=f"checkout:{current_user.id}:{now.isoformat()}")
+    Cart.query.filter_by(user_id=current_user.id).delete()
+    db.session.commit()
+
+    flash(f"✅ Order placed for {len(quantities)} item(s)!", "success")
+    return redirect(url_for('user.view_orders'))
+
 # ------------------ View Orders (Order History) ------------------
+def render_orders(orders):
+    return render_template('order_history.html', orders=orders)
+
+
 @user_bp.route('/orders')
 @login_required
 def view_orders():
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.timestamp.desc()).all()
-    return render_template('order_history.html', orders=orders)
+    return render_orders(db.session.scalars(order_history(current_user.id)).all())
 
 # ------------------ Buy Now (Confirm page) ------------------
 @user_bp.route('/buy_now/<int:product_id>', methods=['GET', 'POST'])
@@ -151,21 +240,28 @@ def buy_now(product_id):
 
     product = Product.query.get(product_id)
 
-    if not product or product.stock < 1:
+    if not product or product.available < 1:
         flash("Product not available or out of stock.", "danger")
         return redirect(url_for('user.home'))
 
     if request.method == 'POST':
         quantity = int(request.form['quantity'])
 
-        if quantity < 1 or quantity > product.stock:
+        if quantity < 1 or quantity > product.available:
             flash("Invalid quantity selected.", "danger")
             return redirect(url_for('user.buy_now', product_id=product.id))
 
-        # Process order
-        product.stock -= quantity
-        order = Order(user_id=current_user.id, product_id=product.id, quantity=quantity)
+        # Process order: the conditional UPDATE re-checks stock atomically
+        if not reserve_stock(product.id, quantity):
+            db.session.rollback()
+            flash("Sorry, that quantity just sold out.", "danger")
+            return redirect(url_for('user.buy_now', product_id=product.id))
+
+        order = Order(user_id=current_user.id, product_id=product.id, quantity=quantity,
+                      **snapshot(product))
         db.session.add(order)
+        db.session.flush()              # assigns order.id for the idempotency key
+        tasks.orders_placed([(product, quantity)], when=order.timestamp, key=f"order:{order.id}")
         db.session.commit()
 
         flash("✅ Order placed successfully!", "success")
@@ -0,0 +1,128 @@
+# app/search.py
+import re
+
+import click
+
+from .extensions import db
+from .models import Product
+
+# FTS5 index over Product.name. rowid mirrors product.id so results join
+# straight back to the product table (stale rows simply stop matching).
+FTS_TABLE = 'product_fts'
+fts = db.table(FTS_TABLE, db.column('rowid'), db.column('name'), db.column('rank'))
+
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(name, tokenize='unicode61 remove_diacritics 2')"
+)
+
+# db.create_all() builds the index alongside the product table
+db.event.listen(Product.__table__, 'after_create', db.DDL(FTS_DDL).execute_if(dialect='sqlite'))
+
+_ready_engines = set()
+
+
+def fts_enabled():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def ensure_index():
+    # Runs inside the caller's transaction so it never competes for the write lock
+    db.session.execute(db.text(FTS_DDL))
+
+
+# ------------------ Keep the index in sync (same transaction as the write) ------------------
+def index_product(product):
+    if not fts_enabled():
+        return
+    ensure_index()
+    remove_product(product.id)
+    db.session.execute(
+        db.text(f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (:id, :name)"),
+        {'id': product.id, 'name': product.name}
+    )
+
+
+def remove_product(product_id):
+    if not fts_enabled():
+        return
+    ensure_index()
+    db.session.execute(db.text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': product_id})
+
+
+def remove_products(product_ids):
+    if not fts_enabled() or not product_ids:
+        return
+    ensure_index()
+    db.session.execute(db.delete(fts).where(fts.c.rowid.in_(product_ids)))
+
+
+def index_products_where(*conditions):
+    """Re-index every product matching `conditions` with two set-based statements."""
+    if not fts_enabled():
+        return
+    ensure_index()
+    ids = db.select(Product.id).where(*conditions)
+    db.session.execute(db.delete(fts).where(fts.c.rowid.in_(ids)))
+    db.session.execute(
+        db.insert(fts).from_select(['rowid', 'name'], db.select(Product.id, Product.name).where(*conditions))
+    )
+
+
+def rebuild_index():
+    ensure_index()
+    db.session.execute(db.text(f"DELETE FROM {FTS_TABLE}"))
+    db.session.execute(db.text(f"INSERT INTO {FTS_TABLE}(rowid, name) SELECT id, name FROM product"))
+    db.session.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    db.session.commit()
+    return db.session.scalar(db.text(f"SELECT count(*) FROM {FTS_TABLE}"))
+
+
+# ------------------ Query ------------------
+def build_match(text):
+    # Every word must match; the last one may be a prefix ("blu" -> "blue").
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_products(text, min_price=None, max_price=None, in_stock=False, limit=50):
+    match = build_match(text or '')
+    if match is None:
+        return []
+
+    if fts_enabled():
+        if db.engine.url not in _ready_engines:
+            ensure_index()
+            db.session.commit()
+            _ready_engines.add(db.engine.url)
+        query = (Product.query
+                 .join(fts, fts.c.rowid == Product.id)
+                 .filter(db.literal_column(FTS_TABLE).op('MATCH')(match))
+                 .order_by(fts.c.rank))
+    else:
+        # Portable fallback for non-SQLite backends
+        query = Product.query.filter(Product.name.ilike(f'%{text.strip()}%')).order_by(Product.name)
+
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if in_stock:
+        query = query.filter(Product.available > 0)
+    return query.limit(limit).all()
+
+
+@click.command('search-reindex')
+def reindex_command():
+    """Rebuild the product full-text search index."""
+    count = rebuild_index()
+    click.echo(f"Indexed {count} products.")
+
+
+def init_app(app):
+    app.config.setdefault('SEARCH_RESULTS_LIMIT', 50)
+    app.cli.add_command(reindex_command)
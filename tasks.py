@@ -0,0 +1,79 @@
+# app/tasks.py
+# Post-order work that runs on the job queue instead of inside the request.
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from .analytics import LOW_STOCK_THRESHOLD, record_sales
+from .extensions import db
+from .inventory import sweep_expired_holds
+from .jobs import enqueue, job
+from .models import Notification, Product
+
+SoldProduct = namedtuple('SoldProduct', 'id merchant_id price')
+
+
+# ------------------ Enqueue helpers (called from routes) ------------------
+def orders_placed(lines, when, key):
+    """`lines` is an iterable of (product, quantity) just sold at `when`."""
+    enqueue('orders_placed', {
+        'when': when.isoformat(),
+        'lines': [[p.id, p.merchant_id, p.price, quantity] for p, quantity in lines],
+    }, key=key)
+
+
+def product_restocked(product_id):
+    enqueue('product_restocked', {'product_id': product_id})
+
+
+def holds_placed(expires_at):
+    # One sweep per minute covers every hold expiring in it; the key
+    # dedupes the job however many holds were placed
+    run_at = expires_at.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    enqueue('sweep_holds', key=f"sweep_holds:{run_at:%Y%m%d%H%M}", run_at=run_at)
+
+
+# ------------------ Handlers ------------------
+@job('orders_placed')
+def handle_orders_placed(payload):
+    when = datetime.fromisoformat(payload['when'])
+    lines = [(SoldProduct(pid, merchant_id, price), quantity)
+             for pid, merchant_id, price, quantity in payload['lines']]
+    record_sales(lines, when=when)
+    notify_low_stock([product.id for product, _ in lines])
+
+
+@job('product_restocked')
+def handle_product_restocked(payload):
+    # The alert is resolved once the product is back above the threshold
+    db.session.execute(
+        db.update(Notification)
+        .where(Notification.product_id == payload['product_id'], Notification.read.is_(False))
+        .where(db.select(Product.stock).where(Product.id == payload['product_id'])
+               .scalar_subquery() > LOW_STOCK_THRESHOLD)
+        .values(read=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@job('sweep_holds')
+def handle_sweep_holds(payload):
+    sweep_expired_holds()
+
+
+def notify_low_stock(product_ids):
+    low = db.session.execute(
+        db.select(Product.id, Product.name, Product.stock, Product.merchant_id)
+        .where(Product.id.in_(product_ids), Product.stock <= LOW_STOCK_THRESHOLD)
+    ).all()
+    if not low:
+        return
+    # One open alert per product is enough
+    already = set(db.session.scalars(
+        db.select(Notification.product_id)
+        .where(Notification.product_id.in_([p.id for p in low]), Notification.read.is_(False))
+    ))
+    db.session.add_all(
+        Notification(user_id=p.merchant_id, product_id=p.id,
+                     message=f"Low stock: {p.name} has {p.stock} left.")
+        for p in low if p.id not in already
+    )
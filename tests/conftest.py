@@ -0,0 +1,17 @@
+# tests/conftest.py
+# The repository root is the `app` package (see README); make it importable
+# under that name even when the checkout directory is called something else.
+import importlib.util
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+if ROOT.name != 'app' and 'app' not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        'app', ROOT / '__init__.py', submodule_search_locations=[str(ROOT)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['app'] = module
+    spec.loader.exec_module(module)
+elif str(ROOT.parent) not in sys.path:
+    sys.path.insert(0, str(ROOT.parent))
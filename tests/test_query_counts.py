@@ -0,0 +1,28 @@
+# tests/test_query_counts.py
+from app.benchmarks import count_queries
+from app.benchmarks.query_counts import add_rows, measure, prepare
+from app.extensions import db
+
+
+def test_query_counts_do_not_grow_with_rows():
+    app, clients, shopper_id = prepare()
+    small = measure(clients)
+    with app.app_context():
+        add_rows(shopper_id, range(4, 301))
+    large = measure(clients)
+
+    grown = {url: (small[url], large[url]) for url in small if large[url] > small[url]}
+    assert grown == {}
+
+
+def test_cached_catalog_hits_issue_no_queries():
+    app, _, _ = prepare()
+    client = app.test_client()
+    first = client.get('/')
+    with app.app_context():
+        engine = db.engine
+
+    with count_queries(engine) as statements:
+        assert client.get('/').status_code == 200
+        assert client.get('/', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert statements == []
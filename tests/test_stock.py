@@ -0,0 +1,11 @@
+# tests/test_stock.py
+from app.benchmarks.stock_contention import run
+
+
+def test_concurrent_purchases_conserve_stock():
+    result = run(buyers=10, purchases=200, stock=100, threads=8)
+
+    assert result['errors'] == 0
+    assert result['final_stock'] >= 0
+    assert result['final_stock'] + result['units_sold'] == result['initial_stock']
+    assert result['final_stock'] == 0          # more was ordered than stocked